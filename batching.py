@@ -0,0 +1,143 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from dataset import dense_to_csr
+
+
+def _csr(G):
+    # sparse graphs carry CSR already, dense ones are converted
+    if "indptr" in G:
+        return G["indptr"], G["indices"], G["edge_dist"]
+    indptr, indices = dense_to_csr(G["A"])
+    rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    return indptr, indices, G["adj"][rows, indices]
+
+
+def collate(graphs):
+    """
+    Collate graphs of different sizes into one block-diagonal sparse graph:
+    - x, positions, (node-level) y stacked over all nodes
+    - indptr / indices / edge_dist: block-diagonal CSR with global node indices
+    - batch: node -> graph index, node_ptr: first node of every graph (B + 1,)
+    - source, (graph-level) y stacked per graph
+    No padding is done.
+    """
+    num_nodes = np.array([int(G["num_nodes"]) for G in graphs], dtype=np.int64)
+    node_ptr = np.zeros(len(graphs) + 1, dtype=np.int64)
+    np.cumsum(num_nodes, out=node_ptr[1:])
+
+    csr = [_csr(G) for G in graphs]
+    degrees = np.concatenate([np.diff(indptr) for indptr, _, _ in csr])
+    slots = np.array([len(indices) for _, indices, _ in csr], dtype=np.int64)
+    indptr = np.zeros(node_ptr[-1] + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.concatenate([indices for _, indices, _ in csr]) + np.repeat(node_ptr[:-1], slots)
+
+    return {
+        "x": np.concatenate([G["x"] for G in graphs]),
+        "positions": np.concatenate([G["positions"] for G in graphs]),
+        "y": np.concatenate([G["y"] for G in graphs]) if np.ndim(graphs[0]["y"]) == 2
+        else np.stack([G["y"] for G in graphs]),
+        "source": np.stack([G["source"] for G in graphs]),
+        "indptr": indptr,
+        "indices": indices,
+        "edge_dist": np.concatenate([edge_dist for _, _, edge_dist in csr]).astype(np.float32),
+        "batch": np.repeat(np.arange(len(graphs)), num_nodes),
+        "node_ptr": node_ptr,
+        "num_nodes": num_nodes,
+        "num_graphs": len(graphs),
+    }
+
+
+def collate_padded(batch):
+    """Same output as collate(), built directly from a padded getGraphs() batch without a Python loop."""
+    mask = batch["mask"]
+    num_nodes = batch["num_nodes"].astype(np.int64)
+    node_ptr = np.zeros(len(num_nodes) + 1, dtype=np.int64)
+    np.cumsum(num_nodes, out=node_ptr[1:])
+
+    # nonzero() walks (graph, row, col) in order, which is exactly the CSR order
+    b, i, j = np.nonzero(batch["A"])
+    rows = node_ptr[b] + i
+    indptr = np.zeros(node_ptr[-1] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=node_ptr[-1]), out=indptr[1:])
+
+    y = batch["y"]
+    return {
+        "x": batch["x"][mask],
+        "positions": batch["positions"][mask],
+        "y": y[mask] if y.ndim == 3 else y,
+        "source": batch["source"],
+        "indptr": indptr,
+        "indices": node_ptr[b] + j,
+        "edge_dist": batch["adj"][b, i, j],
+        "batch": np.repeat(np.arange(len(num_nodes)), num_nodes),
+        "node_ptr": node_ptr,
+        "num_nodes": num_nodes,
+        "num_graphs": len(num_nodes),
+    }
+
+
+class PrefetchLoader:
+    """
+    Minibatch loader that assembles the next batches on background threads
+    while the current one is consumed.
+    - source with __len__/__getitem__ (e.g. ShardedGraphDataset): batches of
+      `batch_size` graphs, optional shuffling, collated with collate()
+    - source with getGraphs() (SignalGraphDataset, dense): `num_graphs`
+      freshly generated graphs in batches of `batch_size` (the last one
+      smaller), or `num_batches` full batches, collated with collate_padded()
+    Batches come out in order; at most `prefetch` are built ahead.
+    """
+
+    def __init__(self, source, batch_size: int = 256, prefetch: int = 2, workers: int = 1,
+                 shuffle: bool = False, seed=None, drop_last: bool = False, num_batches=None,
+                 num_graphs=None):
+        self.source = source
+        self.batch_size = int(batch_size)
+        self.prefetch = max(1, int(prefetch))
+        self.workers = max(1, int(workers))
+        self.shuffle = shuffle
+        self.rng = np.random.default_rng(seed)
+        self.drop_last = drop_last
+        if num_graphs is not None:
+            num_batches = -(-int(num_graphs) // self.batch_size)
+        self.num_batches = num_batches
+        self.num_graphs = int(num_graphs) if num_graphs is not None else None
+
+        self._generated = hasattr(source, "getGraphs")
+        if self._generated and num_batches is None:
+            raise ValueError("num_graphs or num_batches is required when generating batches on the fly")
+
+    def _batches(self):
+        if self._generated:
+            total = self.num_graphs if self.num_graphs is not None else int(self.num_batches) * self.batch_size
+            return [min(self.batch_size, total - s) for s in range(0, total, self.batch_size)]
+        order = self.rng.permutation(len(self.source)) if self.shuffle else np.arange(len(self.source))
+        stop = len(order) - len(order) % self.batch_size if self.drop_last else len(order)
+        return [order[s:s + self.batch_size] for s in range(0, stop, self.batch_size)]
+
+    def _make(self, idx):
+        if self._generated:
+            return collate_padded(self.source.getGraphs(idx))
+        return collate([self.source[int(i)] for i in idx])
+
+    def __len__(self):
+        if self._generated:
+            return int(self.num_batches)
+        n = len(self.source)
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+    def __iter__(self):
+        # generated batches share one RNG stream, so they are built one at a time
+        workers = 1 if self._generated else self.workers
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for idx in self._batches():
+                pending.append(pool.submit(self._make, idx))
+                if len(pending) > self.prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
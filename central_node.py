@@ -0,0 +1,294 @@
+import argparse
+import json
+import random
+import time
+import sys
+import threading
+from typing import Callable, Dict, Any, List, Optional
+import numpy as np
+from dataset import (SignalGraphDataset, algebraic_connectivity, add_consensus_weights, add_moment_values,
+                     centroid_estimate, centroid_terms, consensus_rate)
+from dataset_store import ShardedGraphDataset
+from util import visualize_graph
+import matplotlib.pyplot as plt
+
+from digi.xbee.models.address import XBee64BitAddress
+from digi.xbee.exception import TransmitException
+
+from sim_device import SimXBeeDevice
+from wire_codec import WireCodec
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def send_64(device, addr: XBee64BitAddress, data: bytes):
+    """Unicast `data` to a 64-bit address (DigiMesh call; central_node_zigbee passes its own)."""
+    device.send_data_64(addr, data)
+
+
+def send_init(device, id_to_addr: Dict[str, str], nodes_cfg: Dict[str, Any], positions=None,
+              retries: int = 10, retry_delay: float = 0.4, sleep=time.sleep,
+              codec: Optional[WireCodec] = None, session: Optional[int] = None,
+              max_payload: Optional[int] = None, unicast: Callable = send_64) -> List[str]:
+    """
+    Send INIT (neighbours, value0, per-neighbour consensus weights and the
+    network rate when the node config has "weights" / "rate", optionally the
+    position and the session id) to every node in
+    `nodes_cfg`, with retries, as a wire_codec frame when `codec` is given and
+    as compact JSON otherwise. An INIT longer than `max_payload` (the
+    firmware NP) is not sent. `unicast(device, addr, data)` is the firmware
+    send call. `sleep` is injectable so the event simulator can run the same
+    loop on a virtual clock. Returns the IDs that got their INIT.
+    """
+    delivered = []
+    for node_id, node_info in nodes_cfg.items():
+        if node_id not in id_to_addr:
+            print(f"[CENTRAL] WARN: node '{node_id}' missing from id_to_addr, skipping")
+            continue
+
+        print(node_id)
+        neighbors = node_info.get("neighbours")
+        value0 = node_info.get("value")
+        weights = node_info.get("weights")
+        rate = node_info.get("rate")
+
+        if codec is not None:
+            data = codec.encode_init(list(neighbors), value0, positions[node_id] if positions is not None else None,
+                                     weights=weights, rate=rate, session=session)
+        else:
+            # 7 znamenki kao float32 u binarnom INIT-u (i u JSON vektorskom VAL-u)
+            init_msg = {
+                "t": True,
+                "n": list(neighbors),
+                "v": [float(f"{v:.7g}") for v in value0] if np.ndim(value0) else float(f"{value0:.7g}")
+            }
+            if weights is not None:
+                init_msg["w"] = [round(w, 4) for w in weights]
+            if rate is not None:
+                init_msg["r"] = round(rate, 4)
+            if positions is not None:
+                init_msg["p"] = [round(c, 2) for c in positions[node_id]]
+            if session is not None:
+                init_msg["sid"] = session
+            data = json.dumps(init_msg, separators=(",", ":")).encode("utf-8")
+        print(f"[CENTRAL] INIT payload_len={len(data)} bytes -> {node_id}")
+        if max_payload is not None and len(data) > max_payload:
+            print(f"[CENTRAL] ERROR: INIT for {node_id} is {len(data)} B, over NP={max_payload} B "
+                  f"(use --wire binary), not sent")
+            continue
+        addr = XBee64BitAddress.from_hex_string(id_to_addr[node_id])
+
+        ok = False
+        for attempt in range(1, retries + 1):
+            try:
+                unicast(device, addr, data)
+                ok = True
+                print(f"[CENTRAL] INIT -> {node_id}, MAC -> {addr} (attempt {attempt}) neighbours={neighbors} value0={value0}")
+                break
+            except TransmitException as e:
+                status = getattr(e, "transmit_status", None) or getattr(e, "status", None)
+                print(f"[CENTRAL] TX FAIL -> {node_id} attempt={attempt} status={status}")
+                sleep(retry_delay)
+
+        if ok:
+            delivered.append(node_id)
+        else:
+            print(f"[CENTRAL] ERROR: Could not deliver INIT to {node_id}")
+
+        sleep(0.1)
+
+    return delivered
+
+
+def main(argv, device_cls, unicast: Callable = send_64):
+    """
+    Central CLI. `device_cls` is the firmware device (ZigBeeDevice /
+    DigiMeshDevice) and `unicast` its send call, given by
+    central_node_zigbee.py / central_node_digi.py.
+    """
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", default="/dev/ttyUSB0")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--config", default="config.json")
+    ap.add_argument("--retries", type=int, default=10)
+    ap.add_argument("--retry_delay", type=float, default=0.4)
+    ap.add_argument("--topology", choices=["random", "radius", "knn"], default="random")
+    ap.add_argument("--radius", type=float, default=3.0, help="radio range for --topology radius")
+    ap.add_argument("--k", type=int, default=3, help="neighbours per node for --topology knn")
+    ap.add_argument("--connected", choices=["reject", "repair"], default=None,
+                    help="never ship a disconnected graph (resample or add edges)")
+    ap.add_argument("--min_lambda2", type=float, default=None,
+                    help="reject graphs whose Laplacian lambda_2 is below this (slow consensus)")
+    ap.add_argument("--dataset_dir", default=None, help="ship a stored graph (dataset_store.py) instead of a new one")
+    ap.add_argument("--graph_index", type=int, default=0, help="first graph index in --dataset_dir")
+    ap.add_argument("--send_positions", action="store_true",
+                    help="include node positions in INIT (needed by consensus_node --mode gnn)")
+    ap.add_argument("--sim", action="store_true", help="simulated radio (sim_device.py, UDP on localhost) instead of a serial XBee")
+    ap.add_argument("--start_delay", type=float, default=15, help="seconds to wait for the nodes to start")
+    ap.add_argument("--sessions", type=int, default=1,
+                    help="graphs to run back-to-back over the open devices (nodes need --loop for more than one)")
+    ap.add_argument("--session_timeout", type=float, default=300.0,
+                    help="max seconds to wait for the nodes' DONE reports before the next session")
+    ap.add_argument("--no_plot", action="store_true", help="do not draw the graph")
+    ap.add_argument("--wire", choices=["binary", "json"], default="binary", help="INIT frame encoding")
+    ap.add_argument("--localize", action="store_true",
+                    help="send positions for in-network source localization (consensus_node --localize)")
+    ap.add_argument("--loc_power", type=float, default=2.0, help="--localize: weight = signal ** loc_power")
+    ap.add_argument("--moments", type=int, default=1,
+                    help="send [x, x^2, .., x^M] as value0 (vector consensus: network mean, variance, ...)")
+    ap.add_argument("--weights", choices=["none", "metropolis", "best_constant"], default="none",
+                    help="per-edge consensus weights sent in INIT (none = nodes use their --sigma); "
+                         "best_constant is on the stability edge, use metropolis with --partial stale")
+    args = ap.parse_args(argv)
+
+    cfg = load_config(args.config)
+
+    id_to_addr = cfg["id_to_addr"]
+    nodes_cfg = cfg.get("nodes", None)
+
+    if args.dataset_dir:
+        store = ShardedGraphDataset(args.dataset_dir, dense=True, node_ids=list(id_to_addr))
+    else:
+        # one graph node per configured device, IDs taken from id_to_addr
+        dataset = SignalGraphDataset(
+            node_size=len(id_to_addr),
+            node_ids=list(id_to_addr),
+            topology=args.topology,
+            radius=args.radius,
+            k=args.k,
+            ensure_connected=args.connected,
+            min_algebraic_connectivity=args.min_lambda2,
+        )
+
+    def make_graph(i: int):
+        # same graphs for every run from the shard store, else a new one per session
+        G = store[args.graph_index + i] if args.dataset_dir else dataset.getGraph()
+        nodes_cfg = G["nodes_letters"]
+        positions = dict(zip(nodes_cfg.keys(), G["positions"].tolist()))
+        ei, ej = np.nonzero(np.triu(G["A"]))
+        print(f"[CENTRAL] Graph lambda2={algebraic_connectivity(G['num_nodes'], ei, ej):.4f}")
+        if args.localize:
+            # ground truth and the centralised weighted centroid the nodes should agree on
+            terms = np.mean([centroid_terms(info["value"], positions[nid], args.loc_power)
+                             for nid, info in nodes_cfg.items()], axis=0)
+            est = centroid_estimate(terms)
+            src = G["source"]
+            print(f"[CENTRAL] source=({src[0]:.3f}, {src[1]:.3f}) weighted centroid=({est[0]:.3f}, {est[1]:.3f}) "
+                  f"error={np.hypot(est[0] - src[0], est[1] - src[1]):.3f}")
+        if args.moments > 1:
+            add_moment_values(nodes_cfg, args.moments)
+        if args.weights != "none":
+            W = add_consensus_weights(nodes_cfg, G["A"], args.weights)
+            print(f"[CENTRAL] Weights {args.weights}: rate={consensus_rate(W):.4f} per iteration")
+        return G, nodes_cfg, positions
+
+    if args.sim:
+        device = SimXBeeDevice(args.port, args.baud)
+    else:
+        device = device_cls(args.port, args.baud)
+    acks = set()
+    # DONE reports per session: {sid: {node_id: final value}}
+    results: Dict[int, Dict[str, Any]] = {}
+    results_cv = threading.Condition()
+
+    def on_rx(xbee_message):
+        try:
+            msg = json.loads(xbee_message.data.decode("utf-8"))
+        except Exception:
+            return
+        if isinstance(msg, dict) and msg.get("type") == "ACK_INIT":
+            nid = msg.get("id")
+            if nid:
+                acks.add(str(nid))
+        if isinstance(msg, dict) and msg.get("type") == "DONE":
+            with results_cv:
+                results.setdefault(msg.get("sid"), {})[str(msg.get("id"))] = msg.get("v")
+                results_cv.notify_all()
+
+    for i in range(5):
+        try:
+            device.open()
+            break
+        except:
+            print("Device couldn't open, trying again...")
+            time.sleep(0.5)
+
+
+    device.add_data_received_callback(on_rx)
+
+    print(f"[CENTRAL] Port: {args.port} @ {args.baud}")
+    print(f"[CENTRAL] Addr: {device.get_64bit_addr()}")
+
+    t = args.start_delay
+    print(f"Waiting {t} seconds for others to start...")
+    time.sleep(t)
+
+    # max RF payload (NP) as reported by firmware, INITs longer than this are not sent
+    np_val = None
+    try:
+        np_bytes = device.get_parameter("NP")
+        np_val = int.from_bytes(np_bytes, byteorder="big") if np_bytes is not None else None
+        print(f"[CENTRAL] NP (max RF payload bytes) = {np_val}")
+    except Exception as e:
+        print(f"[CENTRAL] NP read failed: {e}")
+
+    # random 32-bit start so nodes left running (--loop) from an earlier central
+    # run never mistake a new session for a repeated INIT (a collision with the
+    # session such a node still remembers is ~1 in 2^32; sid0 + i stays a varint)
+    sid0 = random.getrandbits(32)
+    for i in range(args.sessions):
+        sid = sid0 + i
+        G, nodes_cfg, positions = make_graph(i)
+        if i == 0 and not args.no_plot:
+            visualize_graph(G)
+        print(f"[CENTRAL] Session {sid} ({i + 1}/{args.sessions}): sending INIT to: {sorted(nodes_cfg.keys())}")
+
+        t0 = time.time()
+        delivered = send_init(
+            device, id_to_addr, nodes_cfg,
+            positions=positions if args.send_positions or args.localize else None,
+            retries=args.retries,
+            retry_delay=args.retry_delay,
+            codec=WireCodec(id_to_addr) if args.wire == "binary" else None,
+            session=sid,
+            max_payload=np_val,
+            unicast=unicast,
+        )
+
+        # wait for every node that got INIT to report, then go straight to the next graph
+        with results_cv:
+            results_cv.wait_for(lambda: set(delivered) <= set(results.get(sid, {})), timeout=args.session_timeout)
+            done = dict(results.get(sid, {}))
+        max_error = float("nan")
+        if done and not args.localize:
+            target = np.mean([info["value"] for info in nodes_cfg.values()], axis=0)
+            max_error = float(np.max(np.abs(np.array(list(done.values()), dtype=np.float64) - target)))
+        print(f"[CENTRAL] Session {sid}: {len(done)}/{len(delivered)} nodes done in {time.time() - t0:.1f}s "
+              f"max_error={max_error:.4g}")
+
+    if args.sessions > 1:
+        # nodes with --loop stop waiting for the next INIT
+        try:
+            device.send_data_broadcast(json.dumps({"type": "END", "sid": sid0 + args.sessions - 1}).encode("utf-8"))
+        except TransmitException as e:
+            print(f"[CENTRAL] END broadcast failed: {e}")
+
+    device.close()
+    if not args.no_plot:
+        plt.show()
+
+def test():
+    dataset = SignalGraphDataset()
+    G = dataset.getGraph()
+    nodes_cfg = G["nodes_letters"]
+
+    init_msg = {
+        "n": ["D","B", "E","C"],
+        "v": float(0.854857),
+    }
+    data = json.dumps(init_msg).encode("utf-8")
+
+    print("SIZEOF INIT PAYLOAD: ", sys.getsizeof(data), len(data))
@@ -0,0 +1,1260 @@
+import argparse
+import json
+import time
+import threading
+from collections import deque
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+import numpy as np
+
+from digi.xbee.models.address import XBee64BitAddress
+from digi.xbee.exception import TransmitException
+
+from dataset import centroid_estimate, centroid_terms, random_walk_sensor
+from gnn_model import GNNModel
+from sim_device import SimXBeeDevice
+from wire_codec import WireCodec, HID_OVERHEAD
+
+DEFAULT_MAX_PAYLOAD = 64  # ako se NP ne moze procitati
+# push-sum: ispod ove tezine w je s / w samo zaokruzivanje kumulativnih suma
+PS_MIN_WEIGHT = 1e-6
+PS_DONE_RETRIES = 3
+EARLY_FRAMES = 256  # okviri susjeda primljeni prije naseg INIT-a
+# GNN: nakon zadnjeg sloja cvor jos toliko wait_timeout_s odgovara na NACK-ove
+GNN_LINGER_ROUNDS = 4
+
+
+def _dist(a, b) -> float:
+    # |a - b| za skalar, max po komponentama za vektor
+    return float(np.max(np.abs(np.asarray(a) - b)))
+
+
+def _fmt(value) -> str:
+    if np.ndim(value):
+        return "[" + " ".join(f"{v:.6f}" for v in value) + "]"
+    return f"{value:.6f}"
+
+
+def load_config(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ConsensusNode:
+    def __init__(
+        self,
+        node_id: str,
+        port: str,
+        baud: int,
+        id_to_addr: Dict[str, str],
+        neighbors: List[str],
+        value0: float,
+        sigma: float,
+        num_iterations: int,
+        wait_timeout_s: float,
+        init_timeout_s: float = 60.0,
+        model: Optional[GNNModel] = None,
+        device=None,
+        wire: str = "binary",
+        tx_mode: str = "unicast",
+        repair_after_s: Optional[float] = None,
+        partial: str = "none",
+        max_staleness: int = 3,
+        tol: Optional[float] = None,
+        stop_hops: Optional[int] = None,
+        accel: str = "none",
+        rate: Optional[float] = None,
+        threshold: float = 1e-3,
+        threshold_decay: float = 1.0,
+        max_silence: int = 10,
+        quant_bits: Optional[int] = None,
+        error_feedback: bool = True,
+        localize: bool = False,
+        loc_power: float = 2.0,
+        sample_fn: Optional[Callable[[float], float]] = None,
+        sample_period_s: float = 1.0,
+    ):
+        self.node_id = node_id
+        self.port = port
+        self.baud = baud
+
+        self.id_to_addr = id_to_addr
+        # "binary" = wire_codec okviri, "json" = stari JSON; primamo oba
+        self.wire = wire
+        self.codec = WireCodec(id_to_addr)
+        self.neighbors = neighbors[:]
+        self.value = float(value0)
+
+        self.sigma = float(sigma)
+        # tezine po susjedu iz INIT-a (centralni --weights), inace sigma
+        self.weights: Dict[str, float] = {}
+
+        # ubrzani konsenzus (dva registra, salje se i dalje samo value):
+        # x(k+1) = omega * (W x(k)) + (1 - omega) * x(k-1)
+        # "momentum": omega = 2 / (1 + sqrt(1 - rate^2)) stalno, "chebyshev":
+        # omega_k po Chebyshevljevoj rekurziji. rate = kontrakcija W po
+        # iteraciji, iz INIT-a (centralni --weights) ili --rate.
+        if accel != "none" and partial != "none":
+            # uskladivanje tokova kasni iteraciju, s drugim redom to divergira
+            raise ValueError("accelerated consensus needs partial='none'")
+        self.accel = accel
+        self._rate_arg = rate
+        self.rate = rate
+        self.prev_value: Optional[float] = None
+        self._omega = 1.0
+
+        # event-triggered (--mode triggered): VAL samo kad se vrijednost od
+        # zadnjeg slanja pomakla vise od threshold * threshold_decay^k (ili
+        # nakon max_silence iteracija tisine); susjedi koriste zadnju primljenu
+        # vrijednost. Azuriranje x += sum w (x^_j - x^_i) po poslanim
+        # vrijednostima x^; x^_j i x^_i nisu iz istog trenutka pa prosjek cuvaju
+        # kumulativni tokovi po bridu kao kod --partial (binarni skalarni VAL).
+        self.triggered = False
+        self.threshold = float(threshold)
+        self.threshold_decay = float(threshold_decay)
+        self.max_silence = int(max_silence)
+        self.sent_hat: Optional[float] = None
+        self.last_sent_k = -1
+        self.tx_sent = 0
+        self.tx_suppressed = 0
+
+        # kvantizirani VAL (--quant_bits 8|16, fiksna tocka na [0, 1]): salje
+        # se Q(x + e), pogreska e = x + e - Q se nosi u sljedecu iteraciju
+        # (error feedback) pa zaokruzivanje ne pomice prosjek
+        self.quant_bits = quant_bits
+        self.error_feedback = error_feedback
+        self.q_err = 0.0
+
+        # lokalizacija izvora (--localize): konsenzus na [s^a px, s^a py, s^a]
+        # (signal iz INIT-a, pozicija iz INIT-a), svaki cvor na kraju ima
+        # tezisno procijenjenu poziciju izvora bez slanja ocitanja centralnom
+        self.localize = localize
+        self.loc_power = float(loc_power)
+
+        # pracenje prosjeka (dinamicki konsenzus): na svakoj granici
+        # sample_period_s novo lokalno ocitanje u = sample_fn(u), vrijednost (i
+        # push-sum masa s) dobije x += u_novo - u. Zbroj x po mrezi ostaje zbroj
+        # trenutnih ocitanja pa konsenzus prati trenutni prosjek bez novog INIT-a.
+        if sample_fn is not None and tol is not None:
+            raise ValueError("tracking runs until num_iterations, tol would stop it")
+        self.sample_fn = sample_fn
+        self.sample_period_s = float(sample_period_s)
+        self.reading = 0.0
+        self._next_sample_t: Optional[float] = None
+        self.samples: List[Tuple[float, float, float]] = []
+
+        self.num_iterations = int(num_iterations)
+        self.wait_timeout_s = float(wait_timeout_s)
+
+        if device is not None:
+            # npr. SimXBeeDevice za simulaciju bez radija (--sim)
+            self.device = device
+        else:
+            self.device = self._make_device()
+
+        self.received_values: Dict[int, Dict[str, float]] = {}
+        # dijelovi vektorskog VAL-a dok ne stignu svi: (k, src) -> vektor s NaN rupama
+        self._val_parts: Dict[Tuple[int, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+        # _on_rx budi run() cim stigne vrijednost / NACK (nema sleep-pollinga)
+        self._cv = threading.Condition(self._lock)
+
+        # vrijeme dolaska vrijednosti po iteraciji i susjedu (xbee_message.timestamp)
+        self.arrivals: Dict[int, Dict[str, float]] = {}
+        self.round_stats: List[Dict[str, Any]] = []
+
+        # "broadcast": jedan okvir po iteraciji za sve susjede; susjed kojem
+        # nakon repair_after_s fali vrijednost trazi je NACK-om (unicast odgovor)
+        self.tx_mode = tx_mode
+        self.repair_after_s = repair_after_s
+        self.sent_values: Dict[int, float] = {}
+        self.repair_requests: List[Tuple[str, int]] = []
+        self._nacked: Set[int] = set()
+
+        # push-sum (--mode push_sum): masa (s, w), kumulativno poslano (s, w) i
+        # zadnje primljene kumulativne sume po susjedu -> izgubljeni okvir ne gubi masu
+        self.ps_s = 0.0
+        self.ps_w = 1.0
+        self.ps_sent = (0.0, 0.0)
+        self.ps_recv: Dict[str, Tuple[int, float, float]] = {}
+        # susjedi koji su javili kraj (PSUM s "d") ne dobivaju vise masu; ocjena
+        # s / w se zamrzne kad w padne ispod PS_MIN_WEIGHT
+        self.ps_done: Set[str] = set()
+        self.ps_est = self.value
+        self.ps_seq = -1
+
+        # djelomicno azuriranje kad neki susjed nije javio vrijednost za k:
+        # "none" = preskoci iteraciju (kao prije), "stale" = zadnja poznata
+        # vrijednost ako nije starija od max_staleness iteracija, "renorm" =
+        # tezine preraspodijeljene na susjede koji su javili.
+        # Prosjek cuva kumulativni tok po bridu: cvor s manjim indeksom je
+        # vlasnik brida i salje svoj tok, drugi cvor se uskladi na -tok.
+        self.partial = partial
+        self.max_staleness = int(max_staleness)
+        self.latest: Dict[str, Tuple[int, float]] = {}
+        self.flows: Dict[str, float] = {}
+        self.owner_flows: Dict[str, Tuple[int, float]] = {}
+        self._owner_seen: Dict[str, int] = {}
+
+        # rano zaustavljanje (tol): conv = broj iteracija za koje su ovaj cvor i
+        # svi cvorovi do conv skokova daleko mirni (|promjena| i razlika do
+        # susjeda < tol); salje se u VAL. conv >= stop_hops (>= promjer grafa,
+        # zadano broj cvorova - 1) -> cijela mreza je konvergirala, cvor salje
+        # jos jedan VAL s oznakom "done" i staje, susjedi koji ga prime isto.
+        self.tol = tol
+        self.stop_hops = stop_hops
+        self.conv = 0
+        self.done = False
+        self.sent_conv: Dict[int, Tuple[int, bool]] = {}
+        self.received_conv: Dict[int, Dict[str, Tuple[int, bool]]] = {}
+        self.latest_conv: Dict[str, int] = {}
+        self.done_neighbors: Set[str] = set()
+
+        # init sinkronizacija
+        self._init_event = threading.Event()
+        self.init_timeout_s = float(init_timeout_s)
+
+        # sesije (centralni salje "sid" u INIT-u): VAL/NACK/PSUM nose sid, okviri
+        # drugih sesija se odbacuju. Uz --loop cvor nakon sesije javi rezultat
+        # centralnom (DONE) i ceka sljedeci INIT bez zatvaranja uredaja; INIT nove
+        # sesije usred rada prekida trenutnu (primijeni se u next_session()).
+        self.session: Optional[int] = None
+        self.central_addr = None
+        self._running = False
+        self._pending_init = None
+        self._ended = False
+        # susjed koji je INIT dobio prije nas vec salje: njegovi okviri (s sid-om)
+        # cekaju nas INIT i tada se obrade, okviri starih sesija se odbace
+        self._early = deque(maxlen=EARLY_FRAMES)
+        self._start_nacks = 0
+
+        # distribuirani GNN: pozicija iz INIT-a, skriveni vektori susjeda po sloju
+        self.model = model
+        self.position = None
+        self.max_payload = DEFAULT_MAX_PAYLOAD
+        self.hidden_received: Dict[int, Dict[str, Dict[int, np.ndarray]]] = {}
+        # poslani skriveni vektori po sloju: NACK(k = sloj) od susjeda ih ponovi
+        self.sent_hidden: Dict[int, np.ndarray] = {}
+
+    # ---------------- firmware (consensus_node_zigbee.py / consensus_node_digi.py) ----------------
+    def _make_device(self):
+        """XBee device on self.port / self.baud; a firmware subclass picks the class."""
+        raise NotImplementedError("use consensus_node_zigbee / consensus_node_digi, or pass device=")
+
+    def _send_64(self, addr: XBee64BitAddress, data: bytes):
+        """Unicast `data` to a 64-bit address (raises TransmitException on failure); DigiMesh call by default."""
+        self.device.send_data_64(addr, data)
+
+    def start(self):
+        self.device.open()
+        self.device.add_data_received_callback(self._on_rx)
+
+        print(f"[{self.node_id}] Port: {self.port} @ {self.baud}")
+        print(f"[{self.node_id}] Adresa: {self.device.get_64bit_addr()}")
+
+        # max RF payload (NP) as reported by firmware.
+        try:
+            np_bytes = self.device.get_parameter("NP")
+            np_val = int.from_bytes(np_bytes, byteorder="big") if np_bytes is not None else None
+            print(f"[{self.node_id}] NP (max RF payload bytes) = {np_val}")
+            if np_val:
+                self.max_payload = np_val
+        except Exception as e:
+            print(f"[{self.node_id}] NP read failed: {e}")
+
+        # cekaj centralni node
+        print(f"[{self.node_id}] Waiting for INIT (neighbours + value0) from central...")
+        if not self._init_event.wait(timeout=self.init_timeout_s):
+            raise TimeoutError(f"[{self.node_id}] INIT not received within {self.init_timeout_s} seconds")
+        with self._lock:
+            self._running = True
+
+        print(f"[{self.node_id}] Susjedi ={self.neighbors} value ={self.value}")
+
+    def next_session(self) -> bool:
+        """
+        Wait (up to init_timeout_s) for the next session's INIT, or apply the
+        one that ended the last run early. False on timeout or END from central.
+        """
+        with self._lock:
+            pending, self._pending_init = self._pending_init, None
+            self._running = False
+            if pending is None and self._ended:
+                return False
+            self._init_event.clear()
+        if pending is not None:
+            self._apply_init(*pending)
+        elif not self._init_event.wait(timeout=self.init_timeout_s):
+            return False
+        with self._lock:
+            if self._ended:
+                return False
+            self._running = True
+        print(f"[{self.node_id}] session={self.session} Susjedi ={self.neighbors} value ={_fmt(self.value)}")
+        return True
+
+    def send_done(self) -> bool:
+        """Report the session result to the central node (the INIT sender)."""
+        if self.session is None or self.central_addr is None:
+            return False
+        value = [round(float(v), 6) for v in self.value] if np.ndim(self.value) else round(float(self.value), 6)
+        data = json.dumps({"type": "DONE", "id": self.node_id, "sid": self.session, "v": value}).encode("utf-8")
+        addr = self.central_addr
+        try:
+            self._send_64(addr, data)
+            return True
+        except TransmitException as e:
+            status = getattr(e, "transmit_status", None) or getattr(e, "status", None)
+            print(f"[{self.node_id}] TX FAIL DONE session={self.session} status={status}")
+            return False
+
+    def stop(self):
+        if self.device and self.device.is_open():
+            self.device.close()
+
+    def _send_raw(self, neighbor_id: str, data: bytes, k: int) -> bool:
+        if neighbor_id not in self.id_to_addr:
+            print(f"[{self.node_id}] Nepoznat susjed '{neighbor_id}'")
+            return False
+
+        addr = XBee64BitAddress.from_hex_string(self.id_to_addr[neighbor_id])
+
+        try:
+            self._send_64(addr, data)
+            return True
+        except TransmitException as e:
+            status = getattr(e, "transmit_status", None) or getattr(e, "status", None)
+            print(f"[{self.node_id}] TX FAIL to={neighbor_id} k={k} status={status}")
+            return False
+
+    def _owned_flows(self) -> Optional[Dict[str, float]]:
+        # JSON VAL + tokovi ne stane u NP (84 B), pa tokove salje samo binarni
+        # format, i to samo za skalarnu vrijednost
+        if (self.partial == "none" and not self.triggered) or self.wire != "binary" or np.ndim(self.value):
+            return None
+        me = self.codec.index[self.node_id]
+        return {n: f for n, f in self.flows.items() if self.codec.index[n] > me}
+
+    def _encode_val(self, k: int, value: float) -> bytes:
+        flows = self._owned_flows()
+        conv = self.sent_conv.get(k)
+        if self.wire == "binary":
+            return self.codec.encode_val(k, self.node_id, value, flows, conv, bits=self.quant_bits, session=self.session)
+        msg = {
+            "type": "VAL",
+            "k": k,
+            "src": self.node_id,
+            "value": value,
+        }
+        if flows is not None:
+            msg["f"] = flows
+        if conv is not None:
+            msg["c"] = conv[0]
+            if conv[1]:
+                msg["d"] = 1
+        if self.session is not None:
+            msg["sid"] = self.session
+        return json.dumps(msg).encode("utf-8")
+
+    def _encode_vector(self, k: int, value: np.ndarray) -> List[bytes]:
+        conv = self.sent_conv.get(k)
+        if self.wire == "binary":
+            return self.codec.encode_val_parts(k, self.node_id, value, self.max_payload, conv, session=self.session)
+
+        # JSON: dijelovi {"value": [...], "o": pomak, "dim": d} koji stanu u NP
+        # (7 znamenki, kao float32 u binarnom formatu)
+        def part(offset, count):
+            msg = {"type": "VAL", "k": k, "src": self.node_id, "dim": len(value), "o": offset,
+                   "value": [float(f"{v:.7g}") for v in value[offset:offset + count]]}
+            if conv is not None:
+                msg["c"] = conv[0]
+                if conv[1]:
+                    msg["d"] = 1
+            if self.session is not None:
+                msg["sid"] = self.session
+            return json.dumps(msg, separators=(",", ":")).encode("utf-8")
+
+        frames, offset = [], 0
+        while offset < len(value):
+            count, data = 1, part(offset, 1)
+            while offset + count < len(value):
+                longer = part(offset, count + 1)
+                if len(longer) > self.max_payload:
+                    break
+                count, data = count + 1, longer
+            frames.append(data)
+            offset += count
+        return frames
+
+    def _encode_vals(self, k: int, value) -> List[bytes]:
+        if np.ndim(value):
+            return self._encode_vector(k, value)
+        return [self._encode_val(k, value)]
+
+    def send_value(self, k: int, neighbor_id: str, value: float) -> bool:
+        ok = True
+        for data in self._encode_vals(k, value):
+
+            # print(f"Sent message to {neighbor_id}")
+
+            print(f"[{self.node_id}] TX VAL payload_len={len(data)} bytes -> {neighbor_id} k={k}")
+            ok = self._send_raw(neighbor_id, data, k) and ok
+        return ok
+
+    def broadcast_value(self, k: int, value: float) -> bool:
+        ok = True
+        for data in self._encode_vals(k, value):
+            print(f"[{self.node_id}] TX VAL payload_len={len(data)} bytes -> * k={k}")
+            ok = self._broadcast_raw(data, k) and ok
+        return ok
+
+    def _broadcast_raw(self, data: bytes, k: int) -> bool:
+        try:
+            self.device.send_data_broadcast(data)
+            return True
+        except TransmitException as e:
+            status = getattr(e, "transmit_status", None) or getattr(e, "status", None)
+            print(f"[{self.node_id}] TX FAIL to=* k={k} status={status}")
+            return False
+
+    def send_nack(self, k: int, neighbor_id: str) -> bool:
+        if self.wire == "binary":
+            data = self.codec.encode_nack(k, self.node_id, session=self.session)
+        else:
+            msg = {"type": "NACK", "k": k, "src": self.node_id}
+            if self.session is not None:
+                msg["sid"] = self.session
+            data = json.dumps(msg).encode("utf-8")
+        print(f"[{self.node_id}] TX NACK -> {neighbor_id} k={k}")
+        return self._send_raw(neighbor_id, data, k)
+
+    def send_hidden(self, layer: int, neighbor_id: str, h: np.ndarray) -> bool:
+        # float32 ako cijeli vektor stane u jedan okvir (isto kao batched forward),
+        # inace float16 razlomljen na dijelove koji stanu u NP
+        wide = len(h) * 4 + HID_OVERHEAD <= self.max_payload
+        values = h.astype(">f4" if wide else ">f2").tobytes()
+        per_chunk = max(2, (self.max_payload - HID_OVERHEAD) // 2 * 2)
+        chunks = [values[i:i + per_chunk] for i in range(0, len(values), per_chunk)] or [b""]
+
+        ok = True
+        for idx, chunk in enumerate(chunks):
+            data = self.codec.encode_hidden(layer, idx, len(chunks), chunk, wide=wide, session=self.session)
+            print(f"[{self.node_id}] TX HID payload_len={len(data)} bytes -> {neighbor_id} l={layer} part={idx + 1}/{len(chunks)}")
+            ok = self._send_raw(neighbor_id, data, layer) and ok
+        return ok
+
+    def _src_id(self, xbee_message) -> Optional[str]:
+        # Tražimo node_id pošiljatelja
+        src64 = str(xbee_message.remote_device.get_64bit_addr()).upper()
+        for nid, addr in self.id_to_addr.items():
+            if addr.upper() == src64:
+                return nid
+        return None
+
+    def _on_hidden(self, xbee_message, msg: Dict[str, Any]):
+        src_id = self._src_id(xbee_message)
+        if src_id is None:
+            return
+
+        with self._cv:
+            parts = self.hidden_received.setdefault(msg["l"], {}).setdefault(src_id, {})
+            parts[msg["i"]] = np.frombuffer(msg["h"], dtype=msg.get("dt", ">f2"))
+            parts["count"] = msg["c"]
+            self._cv.notify_all()
+
+    def _apply_init(self, xbee_message, msg: Dict[str, Any]):
+        neigh = msg.get("n")
+        val0 = msg.get("v")
+        pos = msg.get("p")
+        weights = msg.get("w")
+        rate = msg.get("r")
+
+        with self._lock:
+            self.session = msg.get("sid")
+            self.central_addr = xbee_message.remote_device.get_64bit_addr()
+            self.neighbors = [str(n) for n in neigh]
+            # lista u INIT-u -> vektorski konsenzus (jedan VAL po iteraciji, razlomljen na NP)
+            self.value = np.asarray(val0, dtype=np.float64) if isinstance(val0, list) else float(val0)
+            self.weights = {n: float(w) for n, w in zip(self.neighbors, weights)} if weights is not None else {}
+            self.rate = self._rate_arg if self._rate_arg is not None else rate
+            self.prev_value = None
+            self._omega = 1.0
+            self.sent_hat = None
+            self.last_sent_k = -1
+            self.tx_sent = 0
+            self.tx_suppressed = 0
+            self.q_err = 0.0
+            self.reading = self.value
+            self._next_sample_t = None
+            self.samples.clear()
+            self.position = [float(c) for c in pos] if pos is not None else None
+            if self.localize:
+                if self.position is None:
+                    print(f"[{self.node_id}] WARN: --localize needs positions in INIT (central --localize)")
+                else:
+                    self.value = np.asarray(centroid_terms(val0, self.position, self.loc_power))
+            self.received_values.clear()
+            self._val_parts.clear()
+            self.hidden_received.clear()
+            self.sent_hidden.clear()
+            self.sent_values.clear()
+            self.repair_requests.clear()
+            self._nacked.clear()
+            self.arrivals.clear()
+            self.round_stats.clear()
+            self.ps_s, self.ps_w = self.value, 1.0
+            self.ps_sent = (0.0, 0.0)
+            self.ps_recv.clear()
+            self.ps_done.clear()
+            self.ps_est = self.value
+            self.ps_seq = -1
+            self.latest.clear()
+            self.flows = {n: 0.0 for n in self.neighbors}
+            self.owner_flows.clear()
+            self._owner_seen.clear()
+            self.conv = 0
+            self.done = False
+            self.sent_conv.clear()
+            self.received_conv.clear()
+            self.latest_conv.clear()
+            self.done_neighbors.clear()
+            self._start_nacks = 0
+            early = [m for sid, m in self._early if sid == self.session]
+            self._early.clear()
+
+        self._init_event.set()
+        for xbee_message in early:
+            self._on_rx(xbee_message)
+
+    def _on_rx(self, xbee_message):  # receive_value
+        try:
+            msg = self.codec.decode(xbee_message.data)
+        except Exception:
+            print("Failed")
+            return
+
+        if not isinstance(msg, dict):
+            return
+
+        if msg.get("t") == True:
+            sid = msg.get("sid")
+            with self._lock:
+                if sid is not None and sid == self.session:
+                    return  # ponovljeni INIT (retry centralnog) za sesiju koja vec tece
+                if sid is not None and self._running:
+                    # nova sesija dok ova jos radi: run petlja izlazi, next_session() je primijeni
+                    self._pending_init = (xbee_message, msg)
+                    self._cv.notify_all()
+                    return
+            self._apply_init(xbee_message, msg)
+            return
+
+        if msg.get("type") == "END":
+            with self._lock:
+                if self.session is None:
+                    return
+                self._ended = True
+            self._init_event.set()
+            return
+
+        if not self._init_event.is_set() or msg.get("sid") != self.session:
+            # okvir nove sesije prije naseg INIT-a ili zakasnjeli iz prethodne
+            with self._lock:
+                self._early.append((msg.get("sid"), xbee_message))
+            return
+
+        if msg.get("type") == "HID":
+            self._on_hidden(xbee_message, msg)
+            return
+
+        if msg.get("type") == "PSUM":
+            self._on_push_sum(xbee_message, msg)
+            return
+
+        if msg.get("type") not in ("VAL", "NACK"):
+            return
+
+        k = msg.get("k")
+        value = msg.get("value")
+
+        # broadcast stize i od cvorova koji nam nisu susjedi
+        src_id = self._src_id(xbee_message)
+        if src_id is None or src_id not in self.neighbors:
+            return
+
+        if msg["type"] == "NACK":
+            # odgovara se iz petlje u run(), ne iz RX callbacka
+            with self._cv:
+                self.repair_requests.append((src_id, int(k)))
+                self._cv.notify_all()
+            return
+
+        if "o" in msg:
+            # dio vektora: vrijednost postoji tek kad stignu svi dijelovi
+            with self._lock:
+                parts = self._val_parts.setdefault((int(k), src_id), np.full(int(msg["dim"]), np.nan))
+                parts[msg["o"]:msg["o"] + len(value)] = value
+                if np.isnan(parts).any():
+                    return
+                value = self._val_parts.pop((int(k), src_id))
+        elif isinstance(value, list):
+            value = np.asarray(value, dtype=np.float64)
+        else:
+            value = float(value)
+
+        # Upis u buffer: received_values[k][src_id] = value
+        with self._cv:
+            self.received_values.setdefault(int(k), {})[src_id] = value
+            if int(k) >= self.latest.get(src_id, (-1, 0.0))[0]:
+                self.latest[src_id] = (int(k), value)
+            flow = (msg.get("f") or {}).get(self.node_id)
+            if flow is not None and int(k) > self.owner_flows.get(src_id, (-1, 0.0))[0]:
+                self.owner_flows[src_id] = (int(k), float(flow))
+            if "c" in msg:
+                self.received_conv.setdefault(int(k), {})[src_id] = (int(msg["c"]), bool(msg.get("d")))
+                self.latest_conv[src_id] = int(msg["c"])
+                if msg.get("d"):
+                    self.done_neighbors.add(src_id)
+            self.arrivals.setdefault(int(k), {}).setdefault(src_id, xbee_message.timestamp)
+            self._cv.notify_all()
+
+    def _quantize(self, value: float) -> float:
+        if self.quant_bits is None or np.ndim(value):
+            return np.array(value) if np.ndim(value) else value  # vektori idu kao float32
+        target = value + self.q_err if self.error_feedback else value
+        q = self.codec.quantize(target, self.quant_bits)
+        if self.error_feedback:
+            self.q_err = target - q
+        return q
+
+    def _sample(self, now: float):
+        # novo ocitanje na prvoj iteraciji nakon granice perioda (isti trenuci
+        # na svim cvorovima ako su satovi uskladeni), prvo nakon jednog perioda
+        if self.sample_fn is None:
+            return
+        if np.ndim(self.value):
+            raise ValueError("tracking runs on a scalar value")
+        if self._next_sample_t is None:
+            self._next_sample_t = (now // self.sample_period_s + 1) * self.sample_period_s
+            return
+        if now < self._next_sample_t:
+            return
+        self._next_sample_t = (now // self.sample_period_s + 1) * self.sample_period_s
+        reading = float(self.sample_fn(self.reading))
+        delta = reading - self.reading
+        self.reading = reading
+        self.value = self.value + delta
+        with self._lock:
+            self.ps_s += delta
+        if self.prev_value is not None:
+            # momentum vidi samo razliku koju je napravio konsenzus
+            self.prev_value = self.prev_value + delta
+        self.samples.append((now, reading, self.value))
+        print(f"[{self.node_id}] sample={reading:.6f} value={_fmt(self.value)}")
+
+    def _send_round(self, k: int):
+        sent = self._quantize(self.value)
+        self.sent_values[k] = sent
+        if self.tol is not None:
+            self.sent_conv[k] = (self.conv, self.done)
+        if self.tx_mode == "broadcast":
+            self.broadcast_value(k, sent)
+            return
+
+        # Pošalji svoju vrijednost susjedima (osim onima koji su vec stali).
+        for n in self.neighbors:
+            if n not in self.done_neighbors:
+                self.send_value(k, n, sent)
+
+    def _repair(self, k: int, got: Dict[str, float], waited: float):
+        # odgovori na NACK-ove susjeda (unicast iz povijesti poslanih vrijednosti)
+        with self._lock:
+            requests, self.repair_requests = self.repair_requests, []
+        for n, kk in requests:
+            if kk in self.sent_values:
+                self.send_value(kk, n, self.sent_values[kk])
+
+        # iteracija 0: susjede cija vrijednost nije stigla (izgubljena ili susjed
+        # jos ceka INIT) pitaj NACK-om svakih wait_timeout_s dok se ne jave
+        if k == 0 and waited >= self.wait_timeout_s * (self._start_nacks + 1) \
+                and self._round_timeout(k) > self.wait_timeout_s:
+            self._start_nacks += 1
+            for n in self.neighbors:
+                if n not in got:
+                    self.send_nack(k, n)
+
+        # zatrazi vrijednosti koje nisu stigle broadcastom (jednom po iteraciji)
+        if self.tx_mode != "broadcast" or self.repair_after_s is None or k in self._nacked:
+            return
+        if waited >= self.repair_after_s and len(got) < len(self.neighbors):
+            self._nacked.add(k)
+            for n in self.neighbors:
+                if n not in got:
+                    self.send_nack(k, n)
+
+    def _round_values(self, k: int) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.received_values.get(k, {}))
+
+    def _round_timeout(self, k: int) -> float:
+        # iteracija 0 ceka i susjede od kojih jos nista nije stiglo: mozda jos
+        # cekaju svoj INIT (centralni ih salje redom). Inace bi takav susjed
+        # iteraciju 0 zavrsio s nasom vrijednoscu, a mi bez njegove, i prosjek
+        # bi se pomaknuo (ubrzani konsenzus taj pomak jos pojaca).
+        if k == 0 and any(n not in self.latest for n in self.neighbors):
+            return max(self.wait_timeout_s, self.init_timeout_s)
+        return self.wait_timeout_s
+
+    def _wait_round(self, k: int, t0: float):
+        # spavaj dok ne stignu sve vrijednosti za k, NACK za posluziti ili rok
+        timeout = self._round_timeout(k)
+        deadline = t0 + timeout
+        if self.tx_mode == "broadcast" and self.repair_after_s is not None and k not in self._nacked:
+            deadline = min(deadline, t0 + self.repair_after_s)
+        if timeout > self.wait_timeout_s:
+            deadline = min(deadline, t0 + self.wait_timeout_s * (self._start_nacks + 1))
+        with self._cv:
+            self._cv.wait_for(
+                lambda: (len(self.received_values.get(k, {})) >= len(self.neighbors) or self.repair_requests
+                         or self._pending_init is not None or self._round_timeout(k) < timeout),
+                timeout=max(0.0, deadline - time.time()),
+            )
+
+    def _record_round(self, k: int, t0: float, t_end: float):
+        # latencija cekanja i kada je koji susjed stigao (relativno na kraj slanja)
+        with self._lock:
+            arrivals = dict(self.arrivals.get(k, {}))
+        self.round_stats.append({
+            "k": k,
+            "wait_s": t_end - t0,
+            "recv": len(arrivals),
+            "arrivals": {n: t - t0 for n, t in arrivals.items()},
+        })
+
+    def wait_summary(self) -> Dict[str, Any]:
+        """Mean / max wait per iteration, mean arrival offset and misses per neighbour."""
+        waits = [r["wait_s"] for r in self.round_stats]
+        per_neighbor = {}
+        for n in self.neighbors:
+            offsets = [r["arrivals"][n] for r in self.round_stats if n in r["arrivals"]]
+            per_neighbor[n] = {
+                "mean_s": float(np.mean(offsets)) if offsets else None,
+                "missed": len(self.round_stats) - len(offsets),
+            }
+        return {
+            "mean_wait_s": float(np.mean(waits)) if waits else 0.0,
+            "max_wait_s": float(np.max(waits)) if waits else 0.0,
+            "neighbors": per_neighbor,
+        }
+
+    def _update(self, k: int, got: Dict[str, float]):
+        if self.partial != "none":
+            self._update_partial(k, got)
+            return
+
+        #konsenzus algoritam iz pseudokoda
+        if len(got) < len(self.neighbors):
+            # iteracija preskocena: x(k-1) vise nije prethodni korak, ubrzanje
+            # krece ispocetka (omega = 1, pa nova Chebyshevljeva rekurzija)
+            self.prev_value = None
+            self._omega = 1.0
+            print(f"[{self.node_id}] k={k} recv={len(got)}/{len(self.neighbors)} value={_fmt(self.value)}")
+        else:
+            suma = 0.0
+            for n in self.neighbors:
+                if n in got:
+                    suma += self.weights.get(n, self.sigma) * (got[n] - self.value)
+
+            omega = self._next_omega()
+            x = self.value
+            self.value = self.value + omega * suma + self._momentum(omega, x)
+            self.prev_value = x
+            print(f"[{self.node_id}] k={k} recv={len(got)}/{len(self.neighbors)} value={_fmt(self.value)}")
+
+    def _next_omega(self) -> float:
+        if self.accel == "none" or self.rate is None or self.prev_value is None:
+            return 1.0
+        r2 = self.rate ** 2
+        if self.accel == "momentum":
+            return 2.0 / (1.0 + np.sqrt(1.0 - r2))
+        # chebyshev: omega_1 = 1, omega_2 = 2 / (2 - r^2), omega_k+1 = 1 / (1 - r^2 omega_k / 4)
+        self._omega = 2.0 / (2.0 - r2) if self._omega == 1.0 else 1.0 / (1.0 - r2 * self._omega / 4.0)
+        return self._omega
+
+    def _momentum(self, omega: float, x: float) -> float:
+        # (1 - omega) * (x(k-1) - x(k)); zbroj preko mreze je 0 pa prosjek ostaje
+        if omega == 1.0:
+            return 0.0
+        return (1.0 - omega) * (self.prev_value - x)
+
+    def _update_partial(self, k: int, got: Dict[str, float]):
+        with self._lock:
+            latest = dict(self.latest)
+            owner_flows = dict(self.owner_flows)
+
+        self._reconcile_flows(owner_flows)
+
+        used = {}
+        for n in self.neighbors:
+            if n in got:
+                used[n] = got[n]
+            elif self.partial == "stale" and n in latest and k - latest[n][0] <= self.max_staleness:
+                used[n] = latest[n][1]
+
+        scale = len(self.neighbors) / len(used) if self.partial == "renorm" and used else 1.0
+        x = self.value
+        for n, xj in used.items():
+            f = self.weights.get(n, self.sigma) * scale * (xj - x)
+            self.value = self.value + f
+            self.flows[n] += f
+        print(f"[{self.node_id}] k={k} recv={len(got)}/{len(self.neighbors)} used={len(used)} value={_fmt(self.value)}")
+
+    def _reconcile_flows(self, owner_flows: Dict[str, Tuple[int, float]]):
+        # uskladi tokove bridova kojima nismo vlasnik s novim tokom vlasnika
+        for n, (kk, flow) in owner_flows.items():
+            if self._owner_seen.get(n) == kk:
+                continue
+            self._owner_seen[n] = kk
+            self.value += -flow - self.flows[n]
+            self.flows[n] = -flow
+
+    def _check_converged(self, k: int, got: Dict[str, float]):
+        if self.tol is None:
+            return
+        before = self.sent_values[k]  # kvantizirano ako --quant_bits
+        residual = max([_dist(self.value, before)] + [_dist(x, before) for x in got.values()])
+        with self._lock:
+            conv = dict(self.received_conv.get(k, {}))
+            latest = dict(self.latest_conv)
+
+        if residual < self.tol:
+            # susjed koji nije javio: zadnji poznati conv (0 ako nikad)
+            self.conv = min([self.conv + 1] + [latest.get(n, 0) + 1 for n in self.neighbors])
+        else:
+            self.conv = 0
+
+        hops = self.stop_hops if self.stop_hops is not None else len(self.id_to_addr) - 1
+        if self.conv >= hops or any(d for _, d in conv.values()):
+            self.done = True
+
+    # ---------------- koraci iteracije ----------------
+    # run() / run_push_sum() / run_triggered() ih izvode na pravom satu,
+    # event_sim.py (_NodeProcess) iste korake na virtualnom
+
+    def _begin_round(self, k: int, now: float) -> bool:
+        """Sample and send round k; False when the node stops instead (new session or converged)."""
+        if self._pending_init is not None:
+            print(f"[{self.node_id}] new session, stopping session={self.session} at k={k}")
+            return False
+        self._sample(now)
+        self._send_round(k)
+        if self.done:
+            print(f"[{self.node_id}] converged (tol={self.tol}), stopping at k={k}")
+            return False
+        return True
+
+    def _poll_round(self, k: int, t0: float, now: float) -> Optional[Dict[str, float]]:
+        """
+        Serve repairs for round k (sent at t0); the round's values once every
+        neighbour reported, wait_timeout_s passed or a new session is pending,
+        None while the round should keep waiting.
+        """
+        got = self._round_values(k)
+        waited = now - t0
+        self._repair(k, got, waited)
+        if len(got) >= len(self.neighbors):
+            return got
+        if waited >= self._round_timeout(k) - 1e-9 or self._pending_init is not None:
+            return got
+        return None
+
+    def _end_round(self, k: int, t0: float, now: float, got: Dict[str, float]):
+        self._record_round(k, t0, now)
+        self._update(k, got)
+        self._check_converged(k, got)
+
+    def run(self):
+        for k in range(self.num_iterations):
+            if not self._begin_round(k, time.time()):
+                break
+
+            # Čekaj vrijednosti od svojih susjeda (budi ih _on_rx, bez sleep(0.1)).
+            t0 = time.time()
+            while True:
+                got = self._poll_round(k, t0, time.time())
+                if got is not None:
+                    break
+                self._wait_round(k, t0)
+
+            self._end_round(k, t0, time.time(), got)
+
+        summary = self.wait_summary()
+        arrivals = " ".join(
+            f"{n}={s['mean_s'] * 1e3:+.0f}ms" if s["mean_s"] is not None else f"{n}=-" for n, s in summary["neighbors"].items()
+        )
+        misses = sum(s["missed"] for s in summary["neighbors"].values())
+        print(f"[{self.node_id}] wait mean={summary['mean_wait_s'] * 1e3:.0f}ms max={summary['max_wait_s'] * 1e3:.0f}ms "
+              f"arrival {arrivals} missed={misses}")
+
+    def source_estimate(self) -> Optional[Tuple[float, float]]:
+        """Source position from the current consensus value (--localize)."""
+        if not self.localize or not np.ndim(self.value):
+            return None
+        return centroid_estimate(self.value)
+
+    # ---------------- push-sum (asinkrono) ----------------
+    def _on_push_sum(self, xbee_message, msg: Dict[str, Any]):
+        src_id = self._src_id(xbee_message)
+        if src_id is None or src_id not in self.neighbors:
+            return
+        seq, sent_s, sent_w = int(msg["k"]), float(msg["s"]), float(msg["w"])
+        with self._cv:
+            if msg.get("d"):
+                self.ps_done.add(src_id)
+            last_seq, last_s, last_w = self.ps_recv.get(src_id, (-1, 0.0, 0.0))
+            if seq <= last_seq:
+                return  # stariji okvir, kumulativne sume su vec primljene
+            # sve poslano od zadnjeg primljenog okvira, ukljucujuci izgubljene
+            self.ps_s += sent_s - last_s
+            self.ps_w += sent_w - last_w
+            self.ps_recv[src_id] = (seq, sent_s, sent_w)
+            self.arrivals.setdefault(seq, {}).setdefault(src_id, xbee_message.timestamp)
+            self._cv.notify_all()
+
+    def push_estimate(self) -> float:
+        with self._lock:
+            if self.ps_w >= PS_MIN_WEIGHT:
+                self.ps_est = self.ps_s / self.ps_w
+            return self.ps_est
+
+    def _encode_push_sum(self, k: int, sent_s: float, sent_w: float, done: bool = False) -> bytes:
+        if self.wire == "binary":
+            return self.codec.encode_push_sum(k, self.node_id, sent_s, sent_w, done=done, session=self.session)
+        msg = {"type": "PSUM", "k": k, "src": self.node_id, "s": sent_s, "w": sent_w}
+        if done:
+            msg["d"] = 1
+        if self.session is not None:
+            msg["sid"] = self.session
+        return json.dumps(msg).encode("utf-8")
+
+    def _push_tick(self, k: int):
+        # zadrzi 1/(d+1) mase, ostatak dijele susjedi koji jos rade (isti
+        # kumulativni iznos svima); bez njih masa ostaje na cvoru
+        with self._lock:
+            live = [n for n in self.neighbors if n not in self.ps_done]
+            share = len(live) + 1
+            self.ps_s /= share
+            self.ps_w /= share
+            self.ps_sent = (self.ps_sent[0] + self.ps_s, self.ps_sent[1] + self.ps_w)
+            sent_s, sent_w = self.ps_sent
+        self.ps_seq = k
+        self.value = self.push_estimate()
+        if not live:
+            return
+
+        data = self._encode_push_sum(k, sent_s, sent_w)
+        if self.tx_mode == "broadcast":
+            self._broadcast_raw(data, k)
+        else:
+            for n in live:
+                self._send_raw(n, data, k)
+
+    def run_push_sum(self, period_s: float):
+        """
+        Asynchronous push-sum: every `period_s` the node pushes its running
+        (s, w) sums and never waits for neighbours; received sums are folded
+        in from _on_rx as they arrive. Estimate s / w converges to the average
+        under frame loss because every frame carries cumulative totals. At the
+        end the node tells its neighbours it finished, so they stop sending
+        mass it would never receive.
+        """
+        if np.ndim(self.value):
+            raise ValueError("push-sum runs on a scalar value")
+        t_start = time.time()
+        for k in range(self.num_iterations):
+            if not self._push_step(k, time.time()):
+                break
+            time.sleep(max(0.0, t_start + (k + 1) * period_s - time.time()))
+        return self._push_finish()
+
+    def _push_step(self, k: int, now: float) -> bool:
+        if self._pending_init is not None:
+            return False
+        self._sample(now)
+        self._push_tick(k)
+        print(f"[{self.node_id}] k={k} value={_fmt(self.value)}")
+        return True
+
+    def _push_finish(self) -> float:
+        self.value = self.push_estimate()
+        # javi kraj susjedima koji jos rade (zadnje kumulativne sume + "d"),
+        # inace bi i dalje dijelili masu prema cvoru koji vise ne slusa;
+        # unicast s ponavljanjem i u broadcast nacinu
+        with self._lock:
+            live = [n for n in self.neighbors if n not in self.ps_done]
+            sent_s, sent_w = self.ps_sent
+        seq = self.ps_seq + 1
+        data = self._encode_push_sum(seq, sent_s, sent_w, done=True)
+        for n in live:
+            for _ in range(PS_DONE_RETRIES):
+                if self._send_raw(n, data, seq):
+                    break
+        print(f"[{self.node_id}] push-sum estimate={self.value:.6f}")
+        return self.value
+
+    # ---------------- event-triggered ----------------
+    def _trigger_tick(self, k: int):
+        thr = self.threshold * self.threshold_decay ** k
+        if self.sent_hat is None or _dist(self.value, self.sent_hat) > thr or k - self.last_sent_k >= self.max_silence:
+            self.last_sent_k = k
+            self._send_round(k)
+            self.sent_hat = self.sent_values[k]
+            self.tx_sent += 1
+        else:
+            self.tx_suppressed += 1
+
+    def _trigger_step(self, k: int, now: float) -> bool:
+        if self._pending_init is not None:
+            return False
+        self.triggered = True  # VAL nosi tokove bridova (_owned_flows)
+        self._sample(now)
+        self._trigger_tick(k)
+        return True
+
+    def _trigger_update(self, k: int):
+        with self._lock:
+            latest = dict(self.latest)
+            owner_flows = dict(self.owner_flows)
+        use_flows = self._owned_flows() is not None
+        if use_flows:
+            self._reconcile_flows(owner_flows)
+        suma = 0.0
+        for n in self.neighbors:
+            if n in latest:
+                f = self.weights.get(n, self.sigma) * (latest[n][1] - self.sent_hat)
+                suma += f
+                if use_flows:
+                    self.flows[n] += f
+        self.value = self.value + suma
+        print(f"[{self.node_id}] k={k} heard={len(latest)}/{len(self.neighbors)} value={_fmt(self.value)}")
+
+    def run_triggered(self, period_s: float):
+        """
+        Event-triggered consensus: one iteration every `period_s`, a VAL goes
+        out only when the value moved past the (decaying) threshold since the
+        last send; the update uses the latest value heard from each neighbour.
+        Those values are from different moments on the two ends of an edge,
+        so with --wire binary the VALs carry the per-edge flows (as with
+        --partial) and the average is kept; JSON VALs have no room for them.
+        """
+        t_start = time.time()
+        for k in range(self.num_iterations):
+            if not self._trigger_step(k, time.time()):
+                break
+            time.sleep(max(0.0, t_start + (k + 1) * period_s - time.time()))
+            self._trigger_update(k)
+        total = self.tx_sent + self.tx_suppressed
+        print(f"[{self.node_id}] triggered: sent {self.tx_sent}/{total} rounds "
+              f"({self.tx_suppressed / max(total, 1):.0%} suppressed)")
+        return self.value
+
+    def _complete_hidden(self, layer: int) -> Dict[str, np.ndarray]:
+        # samo susjedi od kojih su stigli svi dijelovi vektora
+        out = {}
+        for src_id, parts in self.hidden_received.get(layer, {}).items():
+            count = parts.get("count", 0)
+            if all(i in parts for i in range(count)):
+                out[src_id] = np.concatenate([parts[i] for i in range(count)])
+        return out
+
+    def _serve_hidden(self):
+        # NACK u GNN nacinu trazi sloj k: ponovi skriveni vektor ako je vec poslan
+        # (sloj koji jos nismo dosegli ionako saljemo kad do njega dodemo)
+        with self._lock:
+            requests, self.repair_requests = self.repair_requests, []
+        for n, layer in requests:
+            if layer in self.sent_hidden:
+                self.send_hidden(layer, n, self.sent_hidden[layer])
+
+    def _wait_hidden(self, layer: int, start: float) -> Dict[str, np.ndarray]:
+        # Dok traje slanje INIT-a (init_timeout_s od pocetka) svaki sloj ceka
+        # susjede koji ga jos nisu poslali: centralni salje INIT redom, pa susjed
+        # moze jos cekati INIT ili (lanac) svog kasnog susjeda. Nakon toga
+        # wait_timeout_s po sloju. Susjedima koji fale NACK svakih wait_timeout_s.
+        t0 = time.time()
+        deadline = max(t0 + self.wait_timeout_s, start + self.init_timeout_s)
+        nacks = 0
+        while True:
+            self._serve_hidden()
+            now = time.time()
+            with self._lock:
+                got = self._complete_hidden(layer)
+                if len(got) >= len(self.neighbors) or now >= deadline or self._pending_init is not None:
+                    return got
+            if now >= t0 + self.wait_timeout_s * (nacks + 1):
+                nacks += 1
+                for n in self.neighbors:
+                    if n not in got:
+                        self.send_nack(layer, n)
+            with self._cv:
+                self._cv.wait_for(
+                    lambda: (len(self._complete_hidden(layer)) >= len(self.neighbors) or self.repair_requests
+                             or self._pending_init is not None),
+                    timeout=max(0.0, min(deadline, t0 + self.wait_timeout_s * (nacks + 1)) - time.time()),
+                )
+
+    def run_gnn(self):
+        """
+        Distributed GNN inference: one message-passing layer per round. Each
+        node sends its hidden vector to its neighbours, waits for theirs and
+        applies the layer locally; the readout gives this node's estimate of
+        the vector to the source. Missing vectors are NACKed every
+        wait_timeout_s; a layer gives up after wait_timeout_s, or once
+        init_timeout_s has passed since the start (neighbours may still be
+        waiting for their INIT). After the last layer the node answers NACKs
+        for another GNN_LINGER_ROUNDS * wait_timeout_s so a neighbour that lost
+        its vector can recover.
+        """
+        if self.model is None:
+            raise ValueError(f"[{self.node_id}] GNN mode needs a model (--model)")
+        if self.position is None:
+            raise ValueError(f"[{self.node_id}] INIT did not carry a position ('p'), needed as GNN input")
+
+        start = time.time()
+        h = self.model.node_features(self.value, self.position)
+        for layer in range(self.model.num_layers):
+            self.sent_hidden[layer] = h
+            for n in self.neighbors:
+                self.send_hidden(layer, n, h)
+
+            got = self._wait_hidden(layer, start)
+            h = self.model.node_layer(layer, h, [got[n] for n in self.neighbors if n in got])
+            print(f"[{self.node_id}] GNN layer={layer} recv={len(got)}/{len(self.neighbors)}")
+
+        rel = self.model.node_readout(h)
+        est = np.asarray(self.position) + rel
+        print(f"[{self.node_id}] GNN source estimate=({est[0]:.3f}, {est[1]:.3f}) rel=({rel[0]:.3f}, {rel[1]:.3f})")
+
+        linger = time.time() + GNN_LINGER_ROUNDS * self.wait_timeout_s
+        while time.time() < linger and self._pending_init is None:
+            self._serve_hidden()
+            with self._cv:
+                self._cv.wait_for(lambda: self.repair_requests or self._pending_init is not None,
+                                  timeout=max(0.0, linger - time.time()))
+        return est
+
+def main(argv, node_cls):
+    """Node CLI; `node_cls` is the firmware subclass (consensus_node_zigbee / consensus_node_digi)."""
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", default="/dev/ttyUSB0")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--id", required=True)
+    ap.add_argument("--config", default="config.json")
+    ap.add_argument("--iters", type=int, default=60)
+    ap.add_argument("--sigma", type=float, default=0.1)
+    ap.add_argument("--timeout", type=float, default=2.0)
+    ap.add_argument("--init_timeout", type=float, default=60.0)
+    ap.add_argument("--mode", choices=["consensus", "push_sum", "triggered", "gnn"], default="consensus")
+    ap.add_argument("--partial", choices=["none", "stale", "renorm"], default="none",
+                    help="consensus: update with stale / renormalised values when a neighbour is missing")
+    ap.add_argument("--max_staleness", type=int, default=3, help="--partial stale: oldest usable value (iterations)")
+    ap.add_argument("--period", type=float, default=0.2, help="push_sum / triggered: seconds per iteration")
+    ap.add_argument("--threshold", type=float, default=1e-3, help="triggered: send when the value moved more than this")
+    ap.add_argument("--threshold_decay", type=float, default=1.0, help="triggered: threshold *= decay every iteration")
+    ap.add_argument("--max_silence", type=int, default=10, help="triggered: send at least every N iterations")
+    ap.add_argument("--accel", choices=["none", "momentum", "chebyshev"], default="none",
+                    help="consensus: second-order update (needs the rate from central --weights or --rate, "
+                         "not combinable with --partial)")
+    ap.add_argument("--rate", type=float, default=None,
+                    help="--accel: per-iteration contraction of the plain update (overrides INIT)")
+    ap.add_argument("--quant_bits", type=int, choices=[8, 16], default=None,
+                    help="binary wire: send VAL values as 8/16-bit fixed point on [0, 1]")
+    ap.add_argument("--no_error_feedback", action="store_true", help="--quant_bits: plain rounding")
+    ap.add_argument("--localize", action="store_true",
+                    help="consensus on signal-weighted position terms, print the source estimate (central --localize)")
+    ap.add_argument("--loc_power", type=float, default=2.0, help="--localize: weight = signal ** loc_power")
+    ap.add_argument("--track", action="store_true",
+                    help="take a new local reading every --sample_period and track the current network average "
+                         "(synthetic random-walk sensor; push_sum keeps tracking under frame loss)")
+    ap.add_argument("--sample_period", type=float, default=1.0, help="--track: seconds between readings")
+    ap.add_argument("--drift", type=float, default=0.05, help="--track: random-walk step (std) per reading")
+    ap.add_argument("--tol", type=float, default=None,
+                    help="consensus: stop early once the whole network changes by less than this")
+    ap.add_argument("--stop_hops", type=int, default=None,
+                    help="--tol: converged rounds/hops before stopping (>= graph diameter, default nodes - 1)")
+    ap.add_argument("--loop", action="store_true",
+                    help="keep the device open and run every new session (INIT) from central until "
+                         "--init_timeout passes without one")
+    ap.add_argument("--model", default=None, help="GNN weights (.npz from gnn_model.py) for --mode gnn")
+    ap.add_argument("--sim", action="store_true", help="simulated radio (sim_device.py, UDP on localhost) instead of a serial XBee")
+    ap.add_argument("--wire", choices=["binary", "json"], default="binary", help="VAL frame encoding (both are received)")
+    ap.add_argument("--tx", choices=["unicast", "broadcast"], default="unicast",
+                    help="one unicast per neighbour or one broadcast per iteration")
+    ap.add_argument("--repair_after", type=float, default=None,
+                    help="broadcast mode: NACK missing neighbour values after this many seconds")
+    args = ap.parse_args(argv)
+    if args.track and args.mode == "gnn":
+        ap.error("--track needs --mode consensus, push_sum or triggered")
+
+    cfg = load_config(args.config)
+    id_to_addr = cfg["id_to_addr"]
+
+    node = node_cls(
+        node_id=args.id,
+        port=args.port,
+        baud=args.baud,
+        id_to_addr=id_to_addr,
+        neighbors=[],
+        value0=0.0,
+        sigma=args.sigma,
+        num_iterations=args.iters,
+        wait_timeout_s=args.timeout,
+        init_timeout_s=args.init_timeout,
+        model=GNNModel.load(args.model) if args.model else None,
+        device=SimXBeeDevice(args.port, args.baud, addr64=id_to_addr[args.id]) if args.sim else None,
+        wire=args.wire,
+        tx_mode=args.tx,
+        repair_after_s=args.repair_after,
+        partial=args.partial,
+        max_staleness=args.max_staleness,
+        tol=args.tol,
+        stop_hops=args.stop_hops,
+        accel=args.accel,
+        rate=args.rate,
+        threshold=args.threshold,
+        threshold_decay=args.threshold_decay,
+        max_silence=args.max_silence,
+        quant_bits=args.quant_bits,
+        error_feedback=not args.no_error_feedback,
+        localize=args.localize,
+        loc_power=args.loc_power,
+        sample_fn=random_walk_sensor(args.drift) if args.track else None,
+        sample_period_s=args.sample_period,
+    )
+
+    node.start()
+    try:
+        while True:
+            if args.mode == "gnn":
+                node.run_gnn()
+            elif args.mode == "push_sum":
+                node.run_push_sum(args.period)
+            elif args.mode == "triggered":
+                node.run_triggered(args.period)
+            else:
+                node.run()
+            est = node.source_estimate()
+            if est is not None:
+                rel = ((est[0] - node.position[0]), (est[1] - node.position[1]))
+                print(f"[{args.id}] source estimate=({est[0]:.3f}, {est[1]:.3f}) relative=({rel[0]:+.3f}, {rel[1]:+.3f})")
+            if args.track:
+                print(f"[{args.id}] tracking: {len(node.samples)} readings, last reading={node.reading:.6f} "
+                      f"average estimate={_fmt(node.value)}")
+            if node._pending_init is None:
+                node.send_done()
+            # --loop: isti proces i otvoren uredaj za sljedecu sesiju (graf) centralnog
+            if not args.loop or not node.next_session():
+                break
+    finally:
+        node.stop()
+
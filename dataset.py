@@ -1,7 +1,322 @@
-import random
+import functools
+import multiprocessing
+import string
 import numpy as np
 # from util import visualize_graph
 
+# above this many nodes the pairwise coin flips are drawn one row at a time
+DENSE_DRAW_MAX_NODES = 2048
+
+
+@functools.lru_cache(maxsize=64)
+def _triu_indices(num_nodes):
+    # cached: the per-graph draw loop would otherwise rebuild it for every graph
+    return np.triu_indices(num_nodes, k=1)
+
+
+def node_labels(num_nodes):
+    """Default node IDs: A..Z, AA..AZ, BA.. (spreadsheet style)."""
+    letters = string.ascii_uppercase
+    labels = []
+    for i in range(num_nodes):
+        label = ""
+        i += 1
+        while i > 0:
+            i, r = divmod(i - 1, len(letters))
+            label = letters[r] + label
+        labels.append(label)
+    return labels
+
+
+def edges_to_csr(num_nodes, ei, ej):
+    """
+    Undirected edge list (each pair once) -> CSR neighbour arrays.
+    Returns (indptr, indices, order) where `order` maps CSR slots back to the
+    doubled edge list [ei, ej] + [ej, ei] (for per-edge attributes).
+    """
+    rows = np.concatenate([ei, ej]).astype(np.int64)
+    cols = np.concatenate([ej, ei]).astype(np.int64)
+    order = np.lexsort((cols, rows))
+    counts = np.bincount(rows, minlength=num_nodes)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, cols[order], order
+
+
+def dense_to_csr(A):
+    """Dense (N, N) 0/1 matrix -> (indptr, indices)."""
+    rows, cols = np.nonzero(A)
+    counts = np.bincount(rows, minlength=A.shape[0])
+    indptr = np.zeros(A.shape[0] + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return indptr, cols.astype(np.int64)
+
+
+def _expand(starts, counts):
+    # for every i: starts[i], starts[i] + 1, ..., starts[i] + counts[i] - 1
+    owner = np.repeat(np.arange(len(counts)), counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(starts, counts) + within
+
+
+def grid_pairs(positions, queries, radius):
+    """
+    All (q, j, dist) with j != q and dist <= radius, for query nodes `queries`
+    against every node. Uses a uniform grid with cell size `radius`, so only
+    the 3x3 surrounding cells are searched (about O(N) for bounded density).
+    """
+    cells = np.floor((positions - positions.min(axis=0)) / radius).astype(np.int64)
+    ny = int(cells[:, 1].max()) + 1
+    keys = cells[:, 0] * ny + cells[:, 1]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    qs, js = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cx = cells[queries, 0] + dx
+            cy = cells[queries, 1] + dy
+            ok = (cx >= 0) & (cy >= 0) & (cy < ny)
+            target = cx[ok] * ny + cy[ok]
+            start = np.searchsorted(sorted_keys, target, side="left")
+            end = np.searchsorted(sorted_keys, target, side="right")
+            owner, slot = _expand(start, end - start)
+            qs.append(queries[ok][owner])
+            js.append(order[slot])
+
+    q = np.concatenate(qs)
+    j = np.concatenate(js)
+    diff = positions[q] - positions[j]
+    dist = np.sqrt((diff * diff).sum(axis=-1))
+    keep = (q != j) & (dist <= radius)
+    return q[keep], j[keep], dist[keep]
+
+
+def radius_edges(positions, radius):
+    """Undirected edges (i < j) between nodes at most `radius` apart."""
+    q, j, _ = grid_pairs(positions, np.arange(len(positions)), radius)
+    keep = q < j
+    return q[keep], j[keep]
+
+
+def knn_edges(positions, k):
+    """
+    Undirected k-nearest-neighbour edges (i < j, union of both directions).
+    The grid search radius starts at the expected k-NN distance and doubles
+    only for the nodes that still have fewer than k candidates.
+    """
+    num_nodes = len(positions)
+    k = min(int(k), num_nodes - 1)
+    if k <= 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+
+    extent = np.ptp(positions, axis=0)
+    area = max(float(extent[0] * extent[1]), 1e-12)
+    radius = max(np.sqrt(k * area / (np.pi * num_nodes)) * 1.5, 1e-9)
+    diagonal = float(np.hypot(extent[0], extent[1]))
+
+    pending = np.arange(num_nodes)
+    src, dst = [], []
+    while len(pending):
+        q, j, dist = grid_pairs(positions, pending, radius)
+        counts = np.bincount(q, minlength=num_nodes)[pending]
+        done = counts >= k
+        if radius > diagonal:
+            done[:] = True
+
+        finished = np.zeros(num_nodes, dtype=bool)
+        finished[pending[done]] = True
+        sel = finished[q]
+        q, j, dist = q[sel], j[sel], dist[sel]
+
+        # nearest first, ties broken by neighbour index
+        order = np.lexsort((j, dist, q))
+        q, j = q[order], j[order]
+        first = np.searchsorted(q, q, side="left")
+        rank = np.arange(len(q)) - first
+        keep = rank < k
+        src.append(q[keep])
+        dst.append(j[keep])
+
+        pending = pending[~done]
+        radius *= 2.0
+
+    src = np.concatenate(src)
+    dst = np.concatenate(dst)
+    pairs = np.unique(np.minimum(src, dst) * num_nodes + np.maximum(src, dst))
+    return pairs // num_nodes, pairs % num_nodes
+
+
+def connected_components(num_nodes, ei, ej):
+    """Union-find over the edge list; returns the component root of every node."""
+    parent = list(range(num_nodes))
+    size = [1] * num_nodes
+
+    def find(a):
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    for a, b in zip(ei.tolist(), ej.tolist()):
+        ra, rb = find(a), find(b)
+        if ra == rb:
+            continue
+        if size[ra] < size[rb]:
+            ra, rb = rb, ra
+        parent[rb] = ra
+        size[ra] += size[rb]
+
+    return np.array([find(a) for a in range(num_nodes)], dtype=np.int64)
+
+
+def connect_components(positions, ei, ej, roots):
+    """
+    Add the minimal number of edges (components - 1) to make the graph
+    connected: repeatedly link the smallest component to its closest node
+    in any other component.
+    """
+    roots = roots.copy()
+    new_i, new_j = [], []
+    while True:
+        labels, counts = np.unique(roots, return_counts=True)
+        if len(labels) <= 1:
+            break
+        inside = np.flatnonzero(roots == labels[np.argmin(counts)])
+        outside = np.flatnonzero(roots != labels[np.argmin(counts)])
+
+        best = (np.inf, -1, -1)
+        step = max(1, (1 << 22) // len(outside))
+        for s in range(0, len(inside), step):
+            rows = inside[s:s + step]
+            diff = positions[rows][:, None, :] - positions[outside][None, :, :]
+            dist = (diff * diff).sum(axis=-1)
+            r, c = np.unravel_index(np.argmin(dist), dist.shape)
+            if dist[r, c] < best[0]:
+                best = (dist[r, c], rows[r], outside[c])
+
+        _, a, b = best
+        new_i.append(min(a, b))
+        new_j.append(max(a, b))
+        roots[inside] = roots[b]
+
+    ei = np.concatenate([ei, np.array(new_i, dtype=np.int64)])
+    ej = np.concatenate([ej, np.array(new_j, dtype=np.int64)])
+    return ei, ej
+
+
+def algebraic_connectivity(num_nodes, ei, ej):
+    """
+    Second smallest eigenvalue of the graph Laplacian (lambda_2, 0 if the
+    graph is disconnected). Dense eigensolver, meant for deployment-sized graphs.
+    """
+    if num_nodes < 2:
+        return 0.0
+    A = np.zeros((num_nodes, num_nodes))
+    A[ei, ej] = 1.0
+    A[ej, ei] = 1.0
+    return float(np.linalg.eigvalsh(_laplacian(A))[1])
+
+
+def _laplacian(W):
+    return np.diag(W.sum(axis=1)) - W
+
+
+def consensus_weights(A, scheme="metropolis"):
+    """
+    Symmetric per-edge weights W for x_i += sum_j W_ij (x_j - x_i) on the
+    dense adjacency A:
+    - "metropolis": W_ij = 1 / (1 + max(d_i, d_j)), stable on any graph
+    - "best_constant": W_ij = 2 / (lambda_2 + lambda_n) of the Laplacian,
+      the fastest single step size for this graph
+    """
+    A = (np.asarray(A) != 0).astype(np.float64)
+    np.fill_diagonal(A, 0.0)
+    if scheme == "metropolis":
+        deg = A.sum(axis=1)
+        return A / (1.0 + np.maximum(deg[:, None], deg[None, :]))
+    if scheme == "best_constant":
+        lam = np.linalg.eigvalsh(_laplacian(A))
+        return A * (2.0 / (lam[1] + lam[-1])) if len(lam) > 1 else A
+    raise ValueError(f"unknown weight scheme '{scheme}'")
+
+
+def consensus_rate(W):
+    """Per-iteration contraction of the disagreement (spectral radius of I - L_W - 11^T/n), < 1 converges."""
+    n = W.shape[0]
+    P = np.eye(n) - _laplacian(W) - np.full((n, n), 1.0 / n)
+    return float(np.max(np.abs(np.linalg.eigvalsh(P))))
+
+
+def add_consensus_weights(nodes_letters, A, scheme="metropolis"):
+    """
+    Add "weights" (aligned with "neighbours") and the network's "rate"
+    (consensus_rate, for accelerated updates) to every node of `nodes_letters`, returns W.
+    """
+    W = consensus_weights(A, scheme)
+    rate = consensus_rate(W)
+    index = {nid: i for i, nid in enumerate(nodes_letters)}
+    for nid, info in nodes_letters.items():
+        info["weights"] = [float(W[index[nid], index[n]]) for n in info["neighbours"]]
+        info["rate"] = rate
+    return W
+
+
+def add_moment_values(nodes_letters, order):
+    """Replace every node's "value" x with [x, x^2, ..., x^order] (vector consensus -> mean, variance, ...)."""
+    for info in nodes_letters.values():
+        x = info["value"]
+        info["value"] = [x ** p for p in range(1, order + 1)]
+
+
+def centroid_terms(signal, position, power=2.0):
+    """
+    [w * px, w * py, w] with w = signal ** power. Their network averages give
+    the signal-weighted centroid of the node positions, an estimate of `source`.
+    """
+    w = float(signal) ** power
+    return [w * float(position[0]), w * float(position[1]), w]
+
+
+def centroid_estimate(terms):
+    """Source position from (averaged) centroid_terms, None while the weight is 0."""
+    if terms[2] <= 0:
+        return None
+    return float(terms[0] / terms[2]), float(terms[1] / terms[2])
+
+
+def random_walk_sensor(step, seed=None):
+    """
+    Synthetic streaming reading for dynamic consensus: read(previous) returns
+    previous + N(0, step), clipped to the normalised signal range [0, 1].
+    """
+    rng = np.random.default_rng(seed)
+
+    def read(previous):
+        return float(np.clip(previous + rng.normal(0.0, step), 0.0, 1.0))
+
+    return read
+
+
+def build_node_dicts(indptr, indices, x, node_ids):
+    """`nodes` (keyed by index) and `nodes_letters` (keyed by node ID) as shipped by central_node_*."""
+    nodes = {}
+    nodes_letters = {}
+    for i in range(len(indptr) - 1):
+        neigh = indices[indptr[i]:indptr[i + 1]]
+        value = float(x[i, 0])
+        nodes[str(i)] = {
+            "neighbours": [str(j) for j in neigh],
+            "value": value,
+        }
+        nodes_letters[node_ids[i]] = {
+            "neighbours": [node_ids[j] for j in neigh],
+            "value": value,
+        }
+    return nodes, nodes_letters
+
+
 class SignalGraphDataset:
     def __init__(
         self,
@@ -11,116 +326,290 @@ class SignalGraphDataset:
         connectivity_prob=0.4,
         label_type="node",
         seed=None,
+        sparse=False,
+        node_ids=None,
+        topology="random",
+        radius=3.0,
+        k=3,
+        ensure_connected=None,
+        min_algebraic_connectivity=None,
+        max_tries=100,
     ):
+        # node_size: fixed number of nodes or a (min, max) range (inclusive)
+        if isinstance(node_size, (tuple, list)):
+            self.min_nodes, self.max_nodes = int(node_size[0]), int(node_size[1])
+        else:
+            self.min_nodes = self.max_nodes = int(node_size)
+        if not 1 <= self.min_nodes <= self.max_nodes:
+            raise ValueError(f"Neispravan broj cvorova: {node_size}")
+
         self.node_size = node_size
         self.std = std
         self.max_distance = max_distance
         self.connectivity_prob = connectivity_prob
         self.label_type = label_type
 
-        # optional reproducibility
-        if seed is not None:
-            random.seed(seed)
-            np.random.seed(seed)
+        # sparse=True: CSR neighbour arrays + edge-list distances instead of dense A/adj
+        self.sparse = sparse
 
-    def getGraph(self):
-        num_nodes = random.randint(self.node_size, self.node_size)
-        positions = np.random.rand(num_nodes, 2) * self.max_distance
+        # topology: "random" (coin flip per pair with connectivity_prob),
+        # "radius" (nodes within `radius`, i.e. radio range) or "knn" (k nearest)
+        if topology not in ("random", "radius", "knn"):
+            raise ValueError(f"Nepoznata topologija: {topology}")
+        self.topology = topology
+        self.radius = radius
+        self.k = k
 
-        # adjacency matrix (0/1)
-        A = np.zeros((num_nodes, num_nodes), dtype=np.float32)
-        for i in range(num_nodes):
-            for j in range(i + 1, num_nodes):
-                if random.random() < self.connectivity_prob:
-                    A[i, j] = 1.0
-                    A[j, i] = 1.0
+        # ensure_connected: None, "reject" (resample disconnected topologies)
+        # or "repair" (add the fewest shortest edges that connect them)
+        if ensure_connected not in (None, "reject", "repair"):
+            raise ValueError(f"Nepoznata opcija povezanosti: {ensure_connected}")
+        self.ensure_connected = ensure_connected
+        # reject topologies whose Laplacian lambda_2 is below this bound (slow consensus)
+        self.min_algebraic_connectivity = min_algebraic_connectivity
+        self.max_tries = max_tries
 
-        source = np.random.rand(2) * self.max_distance
+        # node_ids: ID per node index (e.g. list(config["id_to_addr"])), default A, B, C, ...
+        self.node_ids = list(node_ids) if node_ids is not None else node_labels(self.max_nodes)
+        if len(self.node_ids) < self.max_nodes:
+            raise ValueError(f"node_ids has {len(self.node_ids)} IDs, need {self.max_nodes}")
 
-        # pairwise distances (with tiny eps on diagonal)
-        eps = 1e-6
-        distances = np.zeros((num_nodes, num_nodes), dtype=np.float32)
-        for i in range(num_nodes):
-            for j in range(num_nodes):
-                if i == j:
-                    distances[i, j] = eps
+        # own RNG stream per instance (seed: int, SeedSequence, Generator or None);
+        # the global random / np.random state is never touched
+        self.rng = np.random.default_rng(seed)
+
+    def _num_nodes(self):
+        return int(self.rng.integers(self.min_nodes, self.max_nodes + 1))
+
+    def _sample_edges(self, num_nodes, positions):
+        # geometric topologies use the spatial grid index, no random draws
+        if self.topology == "radius":
+            return radius_edges(positions, self.radius)
+        if self.topology == "knn":
+            return knn_edges(positions, self.k)
+
+        # one coin flip per node pair (upper triangle, row-major order);
+        # drawing row by row consumes the RNG exactly like one bulk draw
+        if num_nodes <= DENSE_DRAW_MAX_NODES:
+            iu, ju = _triu_indices(num_nodes)
+            hit = self.rng.random(len(iu)) < self.connectivity_prob
+            return iu[hit], ju[hit]
+
+        ei, ej = [], []
+        for i in range(num_nodes - 1):
+            hit = np.flatnonzero(self.rng.random(num_nodes - 1 - i) < self.connectivity_prob)
+            ei.append(np.full(len(hit), i, dtype=np.int64))
+            ej.append(hit + i + 1)
+        return np.concatenate(ei), np.concatenate(ej)
+
+    def _sample_topology(self, num_nodes):
+        # positions + edges, redrawn until the connectivity requirements hold
+        for _ in range(self.max_tries):
+            positions = self.rng.random((num_nodes, 2)) * self.max_distance
+            ei, ej = self._sample_edges(num_nodes, positions)
+
+            if self.ensure_connected is not None:
+                roots = connected_components(num_nodes, ei, ej)
+                if np.any(roots != roots[0]):
+                    if self.ensure_connected == "reject":
+                        continue
+                    ei, ej = connect_components(positions, ei, ej, roots)
+
+            if self.min_algebraic_connectivity is not None:
+                if algebraic_connectivity(num_nodes, ei, ej) < self.min_algebraic_connectivity:
                     continue
-                dx = positions[i, 0] - positions[j, 0]
-                dy = positions[i, 1] - positions[j, 1]
-                distances[i, j] = np.sqrt(dx * dx + dy * dy) + eps
+
+            return positions, (ei, ej)
+
+        raise RuntimeError(
+            f"No topology met the connectivity requirements in {self.max_tries} tries "
+            f"(ensure_connected={self.ensure_connected}, "
+            f"min_algebraic_connectivity={self.min_algebraic_connectivity})"
+        )
+
+    def _sample(self, num_nodes):
+        # all random draws for one graph, always in the same order, so the
+        # per-graph and the batched path consume the RNG identically
+        positions, (ei, ej) = self._sample_topology(num_nodes)
+        source = self.rng.random(2) * self.max_distance
+        noise = self.rng.standard_normal(num_nodes).astype(np.float32)
+        return positions, (ei, ej), source, noise
+
+    def _signals(self, positions, source, noise, mask):
+        # positions (B, N, 2), source (B, 2), noise (B, N), mask (B, N) of real nodes
+        eps = 1e-6
 
         # distances from source to each node
-        source_distances = np.zeros(num_nodes, dtype=np.float32)
-        for i in range(num_nodes):
-            dx = positions[i, 0] - source[0]
-            dy = positions[i, 1] - source[1]
-            source_distances[i] = np.sqrt(dx * dx + dy * dy) + eps
+        diff = positions - source[:, None, :]
+        source_distances = (np.sqrt((diff * diff).sum(axis=-1)) + eps).astype(np.float32)
 
         # signal + noise
         signal = 1.0 / source_distances
-        signal = signal + np.random.randn(*signal.shape).astype(np.float32) * self.std
+        signal = signal + noise * self.std
 
-        # normalize to [0, 1]
-        signal_min = float(signal.min())
-        signal_max = float(signal.max())
-        signal = (signal - signal_min) / (signal_max - signal_min + eps)
+        # normalize to [0, 1] (range computed in float64, like the scalar path)
+        signal_min = np.where(mask, signal, np.inf).min(axis=1, keepdims=True)
+        signal_max = np.where(mask, signal, -np.inf).max(axis=1, keepdims=True)
+        scale = (signal_max.astype(np.float64) - signal_min + eps).astype(np.float32)
+        signal = np.where(mask, (signal - signal_min) / scale, 0.0).astype(np.float32)
 
-        x = signal[:, None].astype(np.float32)  # shape (num_nodes, 1)
+        x = signal[:, :, None]  # shape (B, num_nodes, 1)
 
         if self.label_type == "node":
             # relative vector from node to source: (source - position)
-            relative_positions = np.zeros((num_nodes, 2), dtype=np.float32)
-            for i in range(num_nodes):
-                relative_positions[i] = (source - positions[i]).astype(np.float32)
-            y = relative_positions
-
+            y = (source[:, None, :] - positions).astype(np.float32)
+            y[~mask] = 0.0
         elif self.label_type == "graph":
             y = source.astype(np.float32)
         else:
             raise ValueError("Nepoznat tip oznake")
 
-        nodes = {}
-        nodes_letters = {}
-
-        labels = ["A", "B", "C", "D", "E"]
-
-        for label in labels:
-            nodes_letters[label] = {"neighbours":[]}
-
-        for i in range(num_nodes):
-            neighbors = []
-            # n_letters = []
-            for j in range(num_nodes):
-                if A[i, j] > 0:
-                    neighbors.append(str(j))
-                    # n_letters.append(labels[j])
-                    nodes_letters[labels[i]]["neighbours"].append(labels[j])
-                    nodes_letters[labels[j]]["neighbours"].append(labels[i])
-
-            
-            nodes_letters[labels[i]]["value"] = float(x[i, 0])
-            
-            nodes[str(i)] = {
-                "neighbours": neighbors,
-                "value": float(x[i, 0]),
-            }
+        return x, y
 
-        for label in labels:
-            nodes_letters[label]["neighbours"] = list(set(nodes_letters[label]["neighbours"]))
+    def _build(self, draws):
+        # dense batch, graphs padded to the largest one in `draws`
+        batch_size = len(draws)
+        num_nodes = np.array([len(d[0]) for d in draws], dtype=np.int64)
+        max_nodes = int(num_nodes.max())
+        mask = np.arange(max_nodes)[None, :] < num_nodes[:, None]
 
+        positions = np.zeros((batch_size, max_nodes, 2))
+        noise = np.zeros((batch_size, max_nodes), dtype=np.float32)
+        source = np.stack([d[2] for d in draws])
+
+        # adjacency matrix (0/1)
+        A = np.zeros((batch_size, max_nodes, max_nodes), dtype=np.float32)
+        graph_idx, ei, ej = [], [], []
+        for b, (pos, (bi, bj), _, nz) in enumerate(draws):
+            positions[b, :len(pos)] = pos
+            noise[b, :len(nz)] = nz
+            graph_idx.append(np.full(len(bi), b, dtype=np.int64))
+            ei.append(bi)
+            ej.append(bj)
+        graph_idx, ei, ej = np.concatenate(graph_idx), np.concatenate(ei), np.concatenate(ej)
+        A[graph_idx, ei, ej] = 1.0
+        A[graph_idx, ej, ei] = 1.0
+
+        # pairwise distances (with tiny eps on diagonal)
+        eps = 1e-6
+        diff = positions[:, :, None, :] - positions[:, None, :, :]
+        distances = (np.sqrt((diff * diff).sum(axis=-1)) + eps).astype(np.float32)
+        distances[~(mask[:, :, None] & mask[:, None, :])] = 0.0
+
+        x, y = self._signals(positions, source, noise, mask)
 
         return {
-            "x": x,                      # signal per node (num_nodes, 1)
-            "A": A,                      # connectivity matrix (num_nodes, num_nodes)
-            "adj": distances,            # distances matrix (num_nodes, num_nodes)
-            "y": y,                      # label (relative positions) or source position
+            "x": x,
+            "A": A,
+            "adj": distances,
+            "y": y,
             "source": source.astype(np.float32),
+            "positions": positions.astype(np.float32),
             "num_nodes": num_nodes,
+            "mask": mask,
+        }
+
+    def getGraphs(self, batch_size):
+        """
+        Generate `batch_size` graphs at once.
+
+        Random draws are made graph by graph (same order as `getGraph`), the
+        geometry and signals are then computed for the whole batch with NumPy
+        broadcasting. For a given seed the result is identical to calling
+        `getGraph` `batch_size` times.
+
+        Returns stacked arrays: x (B, N, 1), A (B, N, N), adj (B, N, N),
+        y (B, N, 2) or (B, 2), source (B, 2), positions (B, N, 2), plus
+        num_nodes (B,) and mask (B, N). With a node range, graphs are zero
+        padded to the largest N in the batch. Dense output only.
+        """
+        if self.sparse:
+            raise ValueError("getGraphs builds dense batches, use getGraph() with sparse=True")
+
+        draws = [self._sample(self._num_nodes()) for _ in range(batch_size)]
+        return self._build(draws)
+
+    def _getSparseGraph(self, num_nodes, positions, edges, source, noise):
+        ei, ej = edges
+        indptr, indices, order = edges_to_csr(num_nodes, ei, ej)
+
+        # distance per CSR slot (same formula as the dense adj matrix)
+        eps = 1e-6
+        diff = positions[ei] - positions[ej]
+        dist = (np.sqrt((diff * diff).sum(axis=-1)) + eps).astype(np.float32)
+        edge_dist = np.concatenate([dist, dist])[order]
+
+        mask = np.ones((1, num_nodes), dtype=bool)
+        x, y = self._signals(positions[None], source[None], noise[None], mask)
+        return {
+            "x": x[0],
+            "indptr": indptr,            # CSR row pointer (num_nodes + 1,)
+            "indices": indices,          # CSR neighbour indices (num_edges * 2,)
+            "edge_dist": edge_dist,      # distance per CSR slot
+            "y": y[0],
+            "source": source.astype(np.float32),
             "positions": positions.astype(np.float32),
-            "nodes": nodes,
-            "nodes_letters": nodes_letters,
         }
 
+    def getGraph(self):
+        num_nodes = self._num_nodes()
+        positions, edges, source, noise = self._sample(num_nodes)
+
+        if self.sparse:
+            G = self._getSparseGraph(num_nodes, positions, edges, source, noise)
+            indptr, indices = G["indptr"], G["indices"]
+        else:
+            batch = self._build([(positions, edges, source, noise)])
+            G = {
+                "x": batch["x"][0],      # signal per node (num_nodes, 1)
+                "A": batch["A"][0],      # connectivity matrix (num_nodes, num_nodes)
+                "adj": batch["adj"][0],  # distances matrix (num_nodes, num_nodes)
+                "y": batch["y"][0],      # label (relative positions) or source position
+                "source": batch["source"][0],
+                "positions": batch["positions"][0],
+            }
+            indptr, indices = dense_to_csr(G["A"])
+
+        nodes, nodes_letters = build_node_dicts(indptr, indices, G["x"], self.node_ids)
+        G["num_nodes"] = num_nodes
+        G["nodes"] = nodes
+        G["nodes_letters"] = nodes_letters
+        return G
+
+
+def _generate_chunk(task):
+    dataset_kwargs, seed_seq, num_graphs = task
+    dataset = SignalGraphDataset(seed=seed_seq, **dataset_kwargs)
+    if dataset.sparse:
+        return [dataset.getGraph() for _ in range(num_graphs)]
+    return dataset.getGraphs(num_graphs)
+
+
+def generate_chunks(num_graphs, seed=None, workers=1, chunk_size=1024, **dataset_kwargs):
+    """
+    Generate `num_graphs` graphs in chunks of `chunk_size`, in order.
+
+    Chunk c gets its own RNG stream, SeedSequence(seed).spawn(num_chunks)[c],
+    so the result depends only on (seed, chunk_size, dataset_kwargs) and is
+    bit-identical for any number of worker processes.
+    Yields getGraphs() batches, or lists of graphs for sparse=True.
+    """
+    num_chunks = (num_graphs + chunk_size - 1) // chunk_size
+    seeds = np.random.SeedSequence(seed).spawn(num_chunks)
+    tasks = [
+        (dataset_kwargs, seeds[c], min(chunk_size, num_graphs - c * chunk_size))
+        for c in range(num_chunks)
+    ]
+
+    if workers <= 1:
+        for task in tasks:
+            yield _generate_chunk(task)
+        return
+
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for chunk in pool.imap(_generate_chunk, tasks):
+            yield chunk
+
 
 if __name__ == "__main__":
     dataset = SignalGraphDataset(label_type="graph")
@@ -131,4 +620,3 @@ if __name__ == "__main__":
 
     # for label in G["nodes_letters"]:
     #     print(label + " " + str(G["nodes_letters"][label]["neighbours"]))
-    
@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from dataset import SignalGraphDataset, dense_to_csr, build_node_dicts, generate_chunks
+
+INDEX_VERSION = 1
+
+# per-node arrays, concatenated over all graphs in a shard
+NODE_FIELDS = ("x", "positions")
+# per-graph arrays
+GRAPH_FIELDS = ("source",)
+
+
+def _graphs_from_batch(batch):
+    # padded getGraphs() batch -> per-graph sparse dicts
+    for b, n in enumerate(batch["num_nodes"]):
+        n = int(n)
+        indptr, indices = dense_to_csr(batch["A"][b, :n, :n])
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        y = batch["y"][b]
+        yield {
+            "x": batch["x"][b, :n],
+            "indptr": indptr,
+            "indices": indices,
+            "edge_dist": batch["adj"][b, rows, indices],
+            "y": y[:n] if y.ndim == 2 else y,
+            "source": batch["source"][b],
+            "positions": batch["positions"][b, :n],
+            "num_nodes": n,
+        }
+
+
+class ShardWriter:
+    """
+    Streams graphs into fixed-size on-disk shards:
+    - root/shard_XXXXX/<field>.npy, one .npy per field so shards can be memory-mapped
+    - topology stored as CSR (local neighbour indices + per-slot distances)
+    - root/index.npy: offset index, one row per graph (shard, node_offset, num_nodes, slot_offset)
+    - root/index.json: shard list + dataset metadata
+    Only the shard being filled is held in RAM.
+    """
+
+    def __init__(self, root: str, shard_size: int = 10000, meta=None):
+        self.root = root
+        self.shard_size = int(shard_size)
+        self.meta = dict(meta or {})
+        os.makedirs(root, exist_ok=True)
+
+        self.shards = []
+        self.index = []
+        self.label_type = None
+        self._reset()
+
+    def _reset(self):
+        self._buf = {name: [] for name in NODE_FIELDS + GRAPH_FIELDS + ("y", "indices", "edge_dist", "degree")}
+        self._count = 0
+        self._nodes = 0
+        self._slots = 0
+
+    def add(self, G):
+        # accepts dense (A/adj) or sparse (indptr/indices/edge_dist) graphs
+        if "indptr" in G:
+            indptr, indices, edge_dist = G["indptr"], G["indices"], G["edge_dist"]
+        else:
+            indptr, indices = dense_to_csr(G["A"])
+            rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+            edge_dist = G["adj"][rows, indices]
+
+        num_nodes = int(G["num_nodes"])
+        label_type = "node" if np.ndim(G["y"]) == 2 else "graph"
+        if self.label_type is None:
+            self.label_type = label_type
+        elif self.label_type != label_type:
+            raise ValueError("All graphs in a store must have the same label type")
+
+        self.index.append((len(self.shards), self._nodes, num_nodes, self._slots))
+
+        self._buf["x"].append(np.asarray(G["x"], dtype=np.float32))
+        self._buf["positions"].append(np.asarray(G["positions"], dtype=np.float32))
+        self._buf["source"].append(np.asarray(G["source"], dtype=np.float32)[None])
+        y = np.asarray(G["y"], dtype=np.float32)
+        self._buf["y"].append(y if label_type == "node" else y[None])
+        self._buf["degree"].append(np.diff(indptr).astype(np.int32))
+        self._buf["indices"].append(np.asarray(indices, dtype=np.int32))
+        self._buf["edge_dist"].append(np.asarray(edge_dist, dtype=np.float32))
+
+        self._count += 1
+        self._nodes += num_nodes
+        self._slots += len(indices)
+        if self._count >= self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        if self._count == 0:
+            return
+        name = f"shard_{len(self.shards):05d}"
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        for field, parts in self._buf.items():
+            np.save(os.path.join(path, f"{field}.npy"), np.concatenate(parts))
+        self.shards.append({"dir": name, "num_graphs": self._count, "num_nodes": self._nodes})
+        self._reset()
+
+    def close(self):
+        self._flush()
+        np.save(os.path.join(self.root, "index.npy"), np.array(self.index, dtype=np.int64).reshape(-1, 4))
+        info = {
+            "version": INDEX_VERSION,
+            "num_graphs": len(self.index),
+            "shard_size": self.shard_size,
+            "label_type": self.label_type,
+            "shards": self.shards,
+            "meta": self.meta,
+        }
+        with open(os.path.join(self.root, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_chunks(chunks, root: str, shard_size: int = 10000, meta=None):
+    """Stream generate_chunks() output (dense batches or graph lists) into a shard store."""
+    with ShardWriter(root, shard_size=shard_size, meta=meta) as writer:
+        for chunk in chunks:
+            graphs = chunk if isinstance(chunk, list) else _graphs_from_batch(chunk)
+            for G in graphs:
+                writer.add(G)
+    return root
+
+
+def write_dataset(dataset: SignalGraphDataset, root: str, num_graphs: int,
+                  shard_size: int = 10000, batch_size: int = 1024, meta=None):
+    """Generate `num_graphs` graphs from `dataset` and stream them into a shard store."""
+    with ShardWriter(root, shard_size=shard_size, meta=meta) as writer:
+        done = 0
+        while done < num_graphs:
+            n = min(batch_size, num_graphs - done)
+            if dataset.sparse:
+                graphs = (dataset.getGraph() for _ in range(n))
+            else:
+                graphs = _graphs_from_batch(dataset.getGraphs(n))
+            for G in graphs:
+                writer.add(G)
+            done += n
+    return root
+
+
+class ShardedGraphDataset:
+    """
+    Lazy reader for a ShardWriter store.
+    - shards are opened with np.load(mmap_mode="r") on first use (LRU of `max_open_shards`)
+    - ds[i] reads only the slices of graph i, iteration goes shard by shard
+    - dense=True rebuilds A and the full pairwise adj like SignalGraphDataset.getGraph
+    - node_ids given -> nodes / nodes_letters are filled as well
+    """
+
+    def __init__(self, root: str, dense: bool = False, node_ids=None, max_open_shards: int = 4):
+        self.root = root
+        self.dense = dense
+        self.node_ids = list(node_ids) if node_ids is not None else None
+        self.max_open_shards = int(max_open_shards)
+
+        with open(os.path.join(root, "index.json"), "r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        if self.info.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported store version {self.info.get('version')}")
+
+        self.index = np.load(os.path.join(root, "index.npy"), mmap_mode="r")
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()  # loaders read from several threads
+
+    def __len__(self):
+        return int(self.info["num_graphs"])
+
+    def _shard(self, s):
+        with self._lock:
+            if s in self._shards:
+                self._shards.move_to_end(s)
+                return self._shards[s]
+            arrays = self._open_shard(s)
+            self._shards[s] = arrays
+            while len(self._shards) > self.max_open_shards:
+                self._shards.popitem(last=False)
+            return arrays
+
+    def _open_shard(self, s):
+        path = os.path.join(self.root, self.info["shards"][s]["dir"])
+        arrays = {}
+        for name in os.listdir(path):
+            if name.endswith(".npy"):
+                arrays[name[:-4]] = np.load(os.path.join(path, name), mmap_mode="r")
+        # shard-wide CSR row pointer from the stored degrees
+        rowptr = np.zeros(len(arrays["degree"]) + 1, dtype=np.int64)
+        np.cumsum(arrays["degree"], out=rowptr[1:])
+        arrays["rowptr"] = rowptr
+        return arrays
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        s, n0, num_nodes, e0 = (int(v) for v in self.index[i])
+        arrays = self._shard(s)
+        g = i - int(s) * int(self.info["shard_size"])
+        n1 = n0 + num_nodes
+
+        indptr = arrays["rowptr"][n0:n1 + 1] - arrays["rowptr"][n0]
+        e1 = e0 + int(indptr[-1])
+        G = {
+            "x": np.array(arrays["x"][n0:n1]),
+            "indptr": indptr,
+            "indices": np.array(arrays["indices"][e0:e1], dtype=np.int64),
+            "edge_dist": np.array(arrays["edge_dist"][e0:e1]),
+            "y": np.array(arrays["y"][n0:n1] if self.info["label_type"] == "node" else arrays["y"][g]),
+            "source": np.array(arrays["source"][g]),
+            "positions": np.array(arrays["positions"][n0:n1]),
+            "num_nodes": num_nodes,
+        }
+
+        if self.dense:
+            A = np.zeros((num_nodes, num_nodes), dtype=np.float32)
+            rows = np.repeat(np.arange(num_nodes), np.diff(indptr))
+            A[rows, G["indices"]] = 1.0
+            # non-edge distances come from the float32 positions (may differ in the
+            # last bit from generation), edge distances are the stored ones
+            pos = G["positions"].astype(np.float64)
+            diff = pos[:, None, :] - pos[None, :, :]
+            adj = (np.sqrt((diff * diff).sum(axis=-1)) + 1e-6).astype(np.float32)
+            adj[rows, G["indices"]] = G["edge_dist"]
+            G["A"] = A
+            G["adj"] = adj
+
+        if self.node_ids is not None:
+            G["nodes"], G["nodes_letters"] = build_node_dicts(indptr, G["indices"], G["x"], self.node_ids)
+        return G
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True, help="output directory")
+    ap.add_argument("--num_graphs", type=int, required=True)
+    ap.add_argument("--shard_size", type=int, default=10000)
+    ap.add_argument("--nodes", type=int, nargs="+", default=[5], help="N or MIN MAX")
+    ap.add_argument("--label_type", choices=["node", "graph"], default="node")
+    ap.add_argument("--topology", choices=["random", "radius", "knn"], default="random")
+    ap.add_argument("--connectivity_prob", type=float, default=0.4)
+    ap.add_argument("--radius", type=float, default=3.0)
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--connected", choices=["reject", "repair"], default=None)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1, help="generator processes (output does not depend on it)")
+    ap.add_argument("--chunk_size", type=int, default=1024, help="graphs per independent RNG stream")
+    args = ap.parse_args()
+
+    node_size = args.nodes[0] if len(args.nodes) == 1 else tuple(args.nodes[:2])
+    params = {
+        "node_size": node_size,
+        "label_type": args.label_type,
+        "topology": args.topology,
+        "connectivity_prob": args.connectivity_prob,
+        "radius": args.radius,
+        "k": args.k,
+        "ensure_connected": args.connected,
+    }
+    chunks = generate_chunks(
+        args.num_graphs, seed=args.seed, workers=args.workers, chunk_size=args.chunk_size, **params
+    )
+    meta = dict(params, seed=args.seed, chunk_size=args.chunk_size)
+    write_chunks(chunks, args.out, shard_size=args.shard_size, meta=meta)
+    print(f"Wrote {args.num_graphs} graphs to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,594 @@
+import argparse
+import contextlib
+import csv
+import heapq
+import itertools
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+from digi.xbee.exception import TransmitException
+from digi.xbee.models.message import XBeeMessage
+from digi.xbee.models.status import TransmitStatus
+
+from dataset import (SignalGraphDataset, add_consensus_weights, add_moment_values, centroid_estimate,
+                     centroid_terms, node_labels, random_walk_sensor)
+from sim_device import SimMedium, SimRemoteDevice, SimXBeeDevice, sim_addr_for
+from wire_codec import WireCodec
+
+
+class EventSimulator:
+    """Minimal discrete-event engine: a heap of (time, seq, callback) on a virtual clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self._queue = []
+        self._seq = 0
+
+    def schedule(self, at: float, fn, *args):
+        self._seq += 1
+        heapq.heappush(self._queue, (max(at, self.now), self._seq, fn, args))
+
+    def run(self, until: Optional[float] = None):
+        while self._queue:
+            if until is not None and self._queue[0][0] > until:
+                break
+            self.now, _, fn, args = heapq.heappop(self._queue)
+            fn(*args)
+        return self.now
+
+
+class DesMedium(SimMedium):
+    """
+    SimMedium on virtual time: same link model (latency, loss, airtime,
+    NP limit, errors), but a transmit advances the sender's clock instead of
+    sleeping and deliveries become simulator events.
+    Counts frames, payload bytes and lost deliveries.
+    """
+
+    def __init__(self, sim: EventSimulator, **kwargs):
+        super().__init__(**kwargs)
+        self.sim = sim
+        self._channel_free = 0.0
+        self.frames = 0
+        self.bytes = 0
+        self.lost = 0
+
+    def register(self, device: "DesDevice"):
+        # no dispatcher thread, the simulator delivers
+        self._devices[str(device.get_64bit_addr()).upper()] = device
+
+    def transmit(self, src: "DesDevice", dst64: Optional[str], data: bytes):
+        src64 = str(src.get_64bit_addr()).upper()
+        targets = self._targets(src64, dst64, data)
+
+        start = max(src.clock, self._channel_free) if self.shared_channel else src.clock
+        end = start + self.airtime(len(data))
+        if self.shared_channel:
+            self._channel_free = end
+        src.clock = end
+        self.frames += 1
+        self.bytes += len(data)
+
+        delivered = False
+        for dev in targets:
+            latency_s, loss = self._link(src64, str(dev.get_64bit_addr()).upper())
+            if not dev.is_open() or self._rng.random() < loss:
+                self.lost += 1
+                continue
+            msg = XBeeMessage(bytes(data), SimRemoteDevice(src.get_64bit_addr()), end + latency_s, dst64 is None)
+            self.sim.schedule(end + latency_s, dev._deliver, msg)
+            delivered = True
+
+        if dst64 is not None:
+            # TX status comes back after one link latency, delivered or not
+            src.clock += self._link(src64, dst64.upper())[0]
+            if not delivered:
+                raise TransmitException(transmit_status=TransmitStatus.NO_ACK)
+
+
+class DesDevice(SimXBeeDevice):
+    """SimXBeeDevice with its own virtual clock (time spent in blocking sends / sleeps)."""
+
+    def __init__(self, port: str, baud: int, medium: DesMedium, addr64: Optional[str] = None):
+        super().__init__(port, baud, medium=medium, addr64=addr64)
+        self.clock = 0.0
+
+    def sleep(self, seconds: float):
+        self.clock += seconds
+
+    def _deliver(self, msg: XBeeMessage):
+        self.clock = max(self.clock, self.medium.sim.now)
+        super()._deliver(msg)
+
+
+class _NodeProcess:
+    """
+    Runs ConsensusNode's own iteration steps on the virtual clock, in place of
+    the real-time loops that call them:
+    - consensus (run()): _begin_round, then _poll_round whenever a frame
+      arrives, at the repair deadline and at wait_timeout_s (the node's
+      condition-variable wait), then _end_round. With `poll_s` it polls every
+      poll_s seconds instead, like the old sleep(0.1) loop.
+    - push_sum (run_push_sum()): a _push_step every `period_s`, no waiting,
+      _push_finish at the end.
+    - triggered (run_triggered()): _trigger_update of the previous iteration
+      and a _trigger_step every `period_s`.
+    Starts when INIT arrives.
+    """
+
+    def __init__(self, sim: EventSimulator, node, poll_s: Optional[float] = None,
+                 mode: str = "consensus", period_s: float = 0.2):
+        self.sim = sim
+        self.node = node
+        self.poll_s = poll_s
+        self.mode = mode
+        self.period_s = float(period_s)
+        self.k = 0
+        self.t0 = 0.0
+        self._polls = 0
+        self._nack_at = None
+        self.waiting = False
+        self.started_at = None
+        self.finished_at = None
+
+    def open(self):
+        self.node.device.open()
+        self.node.device.add_data_received_callback(self.node._on_rx)
+        self.node.device.add_data_received_callback(self._after_rx)
+        self.sim.schedule(self.node.init_timeout_s, self._init_timeout)
+
+    def _after_rx(self, xbee_message):
+        if self.started_at is None and self.node._init_event.is_set():
+            self.started_at = self.sim.now
+            start = {"push_sum": self._push, "triggered": self._trigger}.get(self.mode, self._begin)
+            self.sim.schedule(self.sim.now, start)
+        elif self.waiting and self.poll_s is None:
+            self.sim.schedule(max(self.sim.now, self.t0), self._poll, self.k)
+
+    def _init_timeout(self):
+        if self.started_at is None:
+            self.node.stop()
+
+    def _push(self):
+        node = self.node
+        node.device.clock = self.sim.now
+        if not node._push_step(self.k, self.sim.now):
+            self._finish_push()
+            return
+        self.k += 1
+        next_at = max(self.started_at + self.k * self.period_s, node.device.clock)
+        self.sim.schedule(next_at, self._push if self.k < node.num_iterations else self._finish_push)
+
+    def _finish_push(self):
+        self.node._push_finish()
+        self._finish()
+
+    def _finish(self):
+        self.finished_at = self.sim.now
+        self.node.stop()
+
+    def _trigger(self):
+        node = self.node
+        node.device.clock = self.sim.now
+        if self.k > 0:
+            node._trigger_update(self.k - 1)
+        if self.k == node.num_iterations or not node._trigger_step(self.k, self.sim.now):
+            self._finish()
+            return
+        self.k += 1
+        self.sim.schedule(max(self.started_at + self.k * self.period_s, node.device.clock), self._trigger)
+
+    def _begin(self):
+        node = self.node
+        node.device.clock = self.sim.now
+        if not node._begin_round(self.k, self.sim.now):
+            self.finished_at = node.device.clock
+            node.stop()
+            return
+        self.t0 = node.device.clock
+        self._polls = 0
+        self._nack_at = None
+        self.waiting = True
+        self.sim.schedule(self.t0, self._poll, self.k)
+        if self.poll_s is None:
+            self.sim.schedule(self.t0 + node.wait_timeout_s, self._poll, self.k)
+            if node._round_timeout(self.k) > node.wait_timeout_s:
+                # round 0 also waits for neighbours not heard from yet (NACKs every
+                # wait_timeout_s, up to init_timeout_s)
+                self.sim.schedule(self.t0 + node._round_timeout(self.k), self._poll, self.k)
+            if node.tx_mode == "broadcast" and node.repair_after_s is not None:
+                self.sim.schedule(self.t0 + node.repair_after_s, self._poll, self.k)
+
+    def _poll(self, k: int):
+        if k != self.k or not self.waiting:
+            return  # stale wake-up from an earlier round
+        node = self.node
+        node.device.clock = self.sim.now
+        got = node._poll_round(self.k, self.t0, self.sim.now)
+        if got is not None:
+            self.waiting = False
+            node._end_round(self.k, self.t0, self.sim.now, got)
+            self.k += 1
+            if self.k < node.num_iterations:
+                self._begin()
+            else:
+                self._finish()
+            return
+        if self.poll_s is not None:
+            self._polls += 1
+            # repair sends above may have kept the node busy past the next poll
+            self.sim.schedule(max(self.t0 + self._polls * self.poll_s, node.device.clock), self._poll, self.k)
+        elif node._round_timeout(self.k) > node.wait_timeout_s:
+            # round 0: next NACK to the neighbours not heard from yet
+            next_at = self.t0 + node.wait_timeout_s * (node._start_nacks + 1)
+            if next_at != self._nack_at:
+                self._nack_at = next_at
+                self.sim.schedule(next_at, self._poll, self.k)
+
+def run_experiment(
+    num_nodes: int = 5,
+    sigma: float = 0.1,
+    timeout: float = 2.0,
+    iters: int = 60,
+    topology: str = "random",
+    k: int = 3,
+    radius: float = 3.0,
+    connectivity_prob: float = 0.4,
+    connected: Optional[str] = "repair",
+    latency_s: float = 0.01,
+    loss: float = 0.0,
+    baud: int = 9600,
+    max_payload: int = 84,
+    shared_channel: bool = False,
+    retries: int = 10,
+    retry_delay: float = 0.4,
+    poll_s: Optional[float] = None,
+    init_timeout: float = 60.0,
+    variant: str = "zigbee",
+    wire: str = "binary",
+    tx_mode: str = "unicast",
+    repair_after: Optional[float] = None,
+    mode: str = "consensus",
+    period: float = 0.2,
+    partial: str = "none",
+    max_staleness: int = 3,
+    tol: Optional[float] = None,
+    stop_hops: Optional[int] = None,
+    weights: str = "none",
+    accel: str = "none",
+    threshold: float = 1e-3,
+    threshold_decay: float = 1.0,
+    quant_bits: Optional[int] = None,
+    error_feedback: bool = True,
+    moments: int = 1,
+    localize: bool = False,
+    loc_power: float = 2.0,
+    track: bool = False,
+    sample_period: float = 1.0,
+    drift: float = 0.05,
+    settle_frac: float = 0.1,
+    bad_links: int = 0,
+    bad_loss: float = 0.5,
+    seed: Optional[int] = None,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """
+    One full experiment on the virtual clock: a graph from SignalGraphDataset,
+    central INIT via central_node_*.send_init, then ConsensusNode rounds on
+    every node (mode="consensus") or run_push_sum() ticks (mode="push_sum").
+    `weights` != "none" ships dataset.consensus_weights (and their rate, used
+    by `accel`) in INIT instead of sigma.
+    `localize` runs source localization (positions in INIT, consensus on
+    centroid_terms) and reports the estimate's distance to G["source"].
+    `track` gives every node a random_walk_sensor(drift) read every
+    `sample_period` s and probes all nodes against the current average of the
+    readings once every node has taken one: track_error / track_max are the
+    RMS / worst error; readings are taken on sample_period boundaries and
+    latency_s is the median time from a boundary until the worst node error
+    fell to `settle_frac` of its peak in that period (settled = share of
+    periods where it did).
+    `bad_links` random graph edges get loss `bad_loss` on top of `loss`.
+    Node prints go to /dev/null unless `verbose`.
+    """
+    if track and (moments > 1 or localize):
+        raise ValueError("tracking runs on scalar readings")
+    if variant == "zigbee":
+        import central_node_zigbee as central_mod
+        import consensus_node_zigbee as node_mod
+    else:
+        import central_node_digi as central_mod
+        import consensus_node_digi as node_mod
+
+    wall0 = time.perf_counter()
+    ids = node_labels(num_nodes)
+    id_to_addr = {nid: sim_addr_for(f"node-{nid}") for nid in ids}
+    G = SignalGraphDataset(
+        node_size=num_nodes,
+        node_ids=ids,
+        topology=topology,
+        radius=radius,
+        k=k,
+        connectivity_prob=connectivity_prob,
+        ensure_connected=connected,
+        seed=seed,
+    ).getGraph()
+
+    if moments > 1:
+        add_moment_values(G["nodes_letters"], moments)
+    if weights != "none":
+        add_consensus_weights(G["nodes_letters"], G["A"], weights)
+
+    sim = EventSimulator()
+    medium = DesMedium(sim, latency_s=latency_s, loss=loss, baud=baud, max_payload=max_payload,
+                       shared_channel=shared_channel, seed=seed)
+    if bad_links:
+        ei, ej = np.nonzero(np.triu(G["A"]))
+        rng = np.random.default_rng(seed)
+        for e in rng.choice(len(ei), min(bad_links, len(ei)), replace=False):
+            medium.set_link(id_to_addr[ids[ei[e]]], id_to_addr[ids[ej[e]]], loss=bad_loss)
+
+    out = None if verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(out) if out else contextlib.nullcontext():
+        procs = []
+        for nid in ids:
+            node = node_mod.ConsensusNode(
+                node_id=nid,
+                port=f"sim-{nid}",
+                baud=baud,
+                id_to_addr=id_to_addr,
+                neighbors=[],
+                value0=0.0,
+                sigma=sigma,
+                num_iterations=iters,
+                wait_timeout_s=timeout,
+                init_timeout_s=init_timeout,
+                device=DesDevice(f"sim-{nid}", baud, medium, addr64=id_to_addr[nid]),
+                wire=wire,
+                tx_mode=tx_mode,
+                repair_after_s=repair_after,
+                partial=partial,
+                max_staleness=max_staleness,
+                tol=tol,
+                stop_hops=stop_hops,
+                accel=accel,
+                threshold=threshold,
+                threshold_decay=threshold_decay,
+                quant_bits=quant_bits,
+                error_feedback=error_feedback,
+                localize=localize,
+                loc_power=loc_power,
+                sample_fn=random_walk_sensor(drift, seed=None if seed is None else [seed, len(procs)]) if track else None,
+                sample_period_s=sample_period,
+            )
+            proc = _NodeProcess(sim, node, poll_s=poll_s, mode=mode, period_s=period)
+            proc.open()
+            procs.append(proc)
+
+        central = DesDevice("sim-central", baud, medium)
+        central.open()
+        delivered = central_mod.send_init(
+            central, id_to_addr, G["nodes_letters"], retries=retries, retry_delay=retry_delay, sleep=central.sleep,
+            codec=WireCodec(id_to_addr) if wire == "binary" else None, max_payload=max_payload,
+            positions=dict(zip(ids, G["positions"].tolist())) if localize else None,
+        )
+        central.close()
+        probes = []
+        probe_s = min(0.05, sample_period / 10)
+        if track:
+
+            def probe():
+                running = [p for p in procs if p.started_at is not None and p.finished_at is None]
+                if len(running) == len(delivered):
+                    probes.append((sim.now, [p.node.value for p in running], [p.node.reading for p in running]))
+                if running or sim.now < init_timeout:
+                    sim.schedule(sim.now + probe_s, probe)
+
+            sim.schedule(0.0, probe)
+        sim.run()
+    if out:
+        out.close()
+
+    # value0 as the nodes start from (scalar, a vector with --moments, centroid terms with --localize)
+    if localize:
+        x0 = np.array([centroid_terms(info["value"], pos, loc_power)
+                       for info, pos in zip(G["nodes_letters"].values(), G["positions"])])
+    else:
+        x0 = np.array([info["value"] for info in G["nodes_letters"].values()], dtype=np.float64)
+    finished = [p for p in procs if p.finished_at is not None]
+    values = np.array([p.node.value for p in finished])
+    if track and probes:
+        # the readings moved on: compare the last state with every node running
+        # against its readings (push-sum nodes left alone at the end lose their weight)
+        values = np.array(probes[-1][1])
+        x0 = np.array(probes[-1][2])
+    loc_error = loc_gap = float("nan")
+    if localize and finished:
+        ests = [p.node.source_estimate() or (np.nan, np.nan) for p in finished]
+        loc_error = float(np.mean([np.hypot(e[0] - G["source"][0], e[1] - G["source"][1]) for e in ests]))
+        central = centroid_estimate(x0.mean(axis=0))
+        loc_gap = float(np.mean([np.hypot(e[0] - central[0], e[1] - central[1]) for e in ests]))
+    track_error = track_max = latency = settled = float("nan")
+    # from the moment every node has taken its first reading (value0 transient over)
+    first = max((p.node.samples[0][0] for p in procs if p.node.samples), default=None)
+    steady = [i for i, pr in enumerate(probes) if first is not None and pr[0] >= first]
+    if steady:
+        x = np.array([probes[i][1] for i in steady])
+        avg = np.array([np.mean(pr[2]) for pr in probes])
+        err = x - avg[steady][:, None]
+        track_error = float(np.sqrt(np.mean(err ** 2)))
+        track_max = float(np.max(np.abs(err)))
+        # readings are taken on sample_period boundaries: per boundary, time
+        # until the worst node error fell to settle_frac of its peak
+        t = np.array([probes[i][0] for i in steady])
+        worst = np.max(np.abs(err), axis=1)
+        lat = []
+        for T in np.arange(np.ceil(t[0] / sample_period) * sample_period, t[-1] - sample_period, sample_period):
+            win = np.flatnonzero((t >= T) & (t < T + sample_period))
+            peak = win[np.argmax(worst[win])]
+            done = win[(win > peak) & (worst[win] <= settle_frac * worst[peak])]
+            lat.append(t[done[0]] - T if len(done) else np.nan)
+        if lat and not np.all(np.isnan(lat)):
+            latency = float(np.nanmedian(lat))
+        if lat:
+            settled = float(np.mean(~np.isnan(lat)))
+    return {
+        "nodes": num_nodes,
+        "topology": topology,
+        "sigma": sigma,
+        "timeout": timeout,
+        "loss": loss,
+        "wire": wire,
+        "tx": tx_mode,
+        "mode": mode,
+        "partial": partial,
+        "tol": tol,
+        "weights": weights,
+        "accel": accel,
+        "quant_bits": quant_bits,
+        "latency": latency_s,
+        "seed": seed,
+        "inited": len(delivered),
+        "finished": len(finished),
+        "duration_s": max((p.finished_at for p in finished), default=float("nan")),
+        "max_error": float(np.max(np.abs(values - x0.mean(axis=0)))) if len(values) else float("nan"),
+        # how far the network average moved away from the true one (sum not conserved)
+        "mean_drift": float(np.max(np.abs(values.mean(axis=0) - x0.mean(axis=0)))) if len(values) else float("nan"),
+        "rounds": float(np.mean([len(p.node.round_stats) for p in finished])) if finished else float("nan"),
+        "mean_wait_s": float(np.mean([p.node.wait_summary()["mean_wait_s"] for p in finished])) if finished else float("nan"),
+        "suppressed": float(np.mean([p.node.tx_suppressed / max(p.node.tx_sent + p.node.tx_suppressed, 1)
+                                     for p in finished])) if finished else float("nan"),
+        "loc_error": loc_error,
+        # what a sink with every reading would get (the value the consensus converges to)
+        "centroid_error": float(np.hypot(*(np.array(centroid_estimate(x0.mean(axis=0))) - G["source"])))
+        if localize else float("nan"),
+        # distance of the node estimates from that centralised centroid (drift of the consensus)
+        "loc_gap": loc_gap,
+        "track_error": track_error,
+        "track_max": track_max,
+        "latency_s": latency,
+        "settled": settled,
+        "frames": medium.frames,
+        "bytes": medium.bytes,
+        "lost": medium.lost,
+        "wall_s": time.perf_counter() - wall0,
+    }
+
+
+def _run_task(task):
+    return run_experiment(**task)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, nargs="+", default=[5])
+    ap.add_argument("--sigma", type=float, nargs="+", default=[0.1])
+    ap.add_argument("--timeout", type=float, nargs="+", default=[2.0])
+    ap.add_argument("--topology", choices=["random", "radius", "knn"], nargs="+", default=["random"])
+    ap.add_argument("--loss", type=float, nargs="+", default=[0.0])
+    ap.add_argument("--latency", type=float, default=0.01)
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--radius", type=float, default=3.0)
+    ap.add_argument("--iters", type=int, default=60)
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--max_payload", type=int, default=84)
+    ap.add_argument("--shared_channel", action="store_true")
+    ap.add_argument("--variant", choices=["zigbee", "digi"], default="zigbee")
+    ap.add_argument("--wire", choices=["binary", "json"], nargs="+", default=["binary"])
+    ap.add_argument("--tx", choices=["unicast", "broadcast"], nargs="+", default=["unicast"])
+    ap.add_argument("--repair_after", type=float, default=None)
+    ap.add_argument("--mode", choices=["consensus", "push_sum", "triggered"], nargs="+", default=["consensus"])
+    ap.add_argument("--period", type=float, default=0.2, help="push_sum / triggered: seconds per iteration")
+    ap.add_argument("--threshold", type=float, default=1e-3)
+    ap.add_argument("--threshold_decay", type=float, default=1.0)
+    ap.add_argument("--quant_bits", type=int, choices=[8, 16], nargs="+", default=[None])
+    ap.add_argument("--no_error_feedback", action="store_true")
+    ap.add_argument("--moments", type=int, default=1, help="vector consensus on [x, x^2, .., x^M]")
+    ap.add_argument("--localize", action="store_true",
+                    help="source localization, reports loc_error and the gap to the centralised centroid")
+    ap.add_argument("--loc_power", type=float, default=2.0)
+    ap.add_argument("--track", action="store_true",
+                    help="dynamic consensus on random-walk readings, reports tracking error and per-reading latency")
+    ap.add_argument("--sample_period", type=float, default=1.0, help="--track: seconds between readings")
+    ap.add_argument("--drift", type=float, default=0.05, help="--track: random-walk step (std) per reading")
+    ap.add_argument("--settle_frac", type=float, default=0.1,
+                    help="--track: latency = time until the worst error fell to this share of its peak")
+    ap.add_argument("--partial", choices=["none", "stale", "renorm"], nargs="+", default=["none"])
+    ap.add_argument("--max_staleness", type=int, default=3)
+    ap.add_argument("--tol", type=float, nargs="+", default=[None], help="early stopping tolerance")
+    ap.add_argument("--stop_hops", type=int, default=None)
+    ap.add_argument("--weights", choices=["none", "metropolis", "best_constant"], nargs="+", default=["none"])
+    ap.add_argument("--accel", choices=["none", "momentum", "chebyshev"], nargs="+", default=["none"])
+    ap.add_argument("--bad_links", type=int, default=0, help="edges with extra loss --bad_loss")
+    ap.add_argument("--bad_loss", type=float, default=0.5)
+    ap.add_argument("--poll", type=float, default=None,
+                    help="model sleep-polling every POLL s instead of the event-driven wait")
+    ap.add_argument("--runs", type=int, default=10, help="experiments (graph/loss seeds) per configuration")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--out", default=None, help="write one CSV row per experiment")
+    ap.add_argument("--verbose", action="store_true", help="keep node output (single worker)")
+    args = ap.parse_args()
+
+    tasks = []
+    for n, sigma, timeout, topology, loss, wire, tx, mode, partial, tol, weights, accel, bits in itertools.product(
+        args.nodes, args.sigma, args.timeout, args.topology, args.loss, args.wire, args.tx, args.mode, args.partial,
+        args.tol, args.weights, args.accel, args.quant_bits,
+    ):
+        for r in range(args.runs):
+            tasks.append(dict(
+                num_nodes=n, sigma=sigma, timeout=timeout, topology=topology, loss=loss,
+                latency_s=args.latency, k=args.k, radius=args.radius, iters=args.iters, baud=args.baud,
+                max_payload=args.max_payload, shared_channel=args.shared_channel, variant=args.variant, wire=wire,
+                tx_mode=tx, repair_after=args.repair_after, poll_s=args.poll,
+                mode=mode, period=args.period, partial=partial, max_staleness=args.max_staleness,
+                tol=tol, stop_hops=args.stop_hops, weights=weights, accel=accel,
+                threshold=args.threshold, threshold_decay=args.threshold_decay,
+                quant_bits=bits, error_feedback=not args.no_error_feedback, moments=args.moments,
+                localize=args.localize, loc_power=args.loc_power, track=args.track,
+                sample_period=args.sample_period, drift=args.drift, settle_frac=args.settle_frac, bad_links=args.bad_links, bad_loss=args.bad_loss,
+                seed=args.seed + r, verbose=args.verbose,
+            ))
+
+    t0 = time.perf_counter()
+    if args.workers > 1:
+        with multiprocessing.get_context("spawn").Pool(args.workers) as pool:
+            results = list(pool.imap(_run_task, tasks))
+    else:
+        results = [_run_task(task) for task in tasks]
+    wall = time.perf_counter() - t0
+
+    if args.out:
+        with open(args.out, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+    keys = ("nodes", "topology", "sigma", "timeout", "loss", "wire", "tx", "mode", "partial", "tol", "weights", "accel", "quant_bits")
+    for cfg, group in itertools.groupby(results, key=lambda r: tuple(r[key] for key in keys)):
+        group = list(group)
+        print(
+            "[DES] " + " ".join(f"{key}={val}" for key, val in zip(keys, cfg))
+            + f" | max_error={np.nanmean([r['max_error'] for r in group]):.4g}"
+            + f" drift={np.nanmean([r['mean_drift'] for r in group]):.2g}"
+            + f" duration={np.nanmean([r['duration_s'] for r in group]):.1f}s"
+            + f" rounds={np.nanmean([r['rounds'] for r in group]):.1f}"
+            + f" wait={np.nanmean([r['mean_wait_s'] for r in group]) * 1e3:.0f}ms"
+            + f" finished={np.mean([r['finished'] / r['nodes'] for r in group]):.0%}"
+            + f" frames={np.mean([r['frames'] for r in group]):.0f}"
+            + f" suppressed={np.nanmean([r['suppressed'] for r in group]):.0%}"
+            + (f" loc_error={np.nanmean([r['loc_error'] for r in group]):.3f}"
+               f" (centralised {np.nanmean([r['centroid_error'] for r in group]):.3f},"
+               f" gap {np.nanmean([r['loc_gap'] for r in group]):.3f})" if args.localize else "")
+            + (f" track_error={np.nanmean([r['track_error'] for r in group]):.4f}"
+               f" track_max={np.nanmean([r['track_max'] for r in group]):.4f}"
+               f" latency={np.nanmean([r['latency_s'] for r in group]):.2f}s"
+               f" settled={np.nanmean([r['settled'] for r in group]):.0%}" if args.track else "")
+        )
+    print(f"[DES] {len(results)} experiments in {wall:.1f}s ({len(results) / wall * 60:.0f}/min)")
+
+
+if __name__ == "__main__":
+    main()
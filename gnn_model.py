@@ -0,0 +1,219 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from dataset import SignalGraphDataset
+from batching import PrefetchLoader
+
+
+def segment_sum(values, indptr):
+    """Row sums of CSR-ordered per-slot values (slots of row i: indptr[i]..indptr[i+1])."""
+    out = np.zeros((len(indptr) - 1,) + values.shape[1:], dtype=values.dtype)
+    nonempty = indptr[1:] > indptr[:-1]
+    if len(values):
+        # reduceat over non-empty rows only (empty rows would repeat the next value)
+        out[nonempty] = np.add.reduceat(values, indptr[:-1][nonempty], axis=0)
+    return out
+
+
+def graph_mean(values, node_ptr):
+    """Mean of node values per graph (node_ptr as produced by batching.collate)."""
+    counts = np.maximum(np.diff(node_ptr), 1)[:, None]
+    return segment_sum(values, node_ptr) / counts
+
+
+class GNNModel:
+    """
+    Pure NumPy message-passing GNN for source localization:
+    - node input: [signal x, position / scale]
+    - layer l: h' = relu(h W_self + agg(h) W_neigh + b), agg = neighbour mean
+      ("mean") or inverse-distance weighted mean over `edge_dist` ("distance")
+    - readout: per node (label_type="node", relative vector to source) or
+      mean-pooled per graph (label_type="graph", source position)
+    Works on collated batches (batching.collate / collate_padded), so one
+    forward() call covers thousands of graphs.
+    """
+
+    def __init__(self, params, label_type="node", aggregation="mean", scale=10.0):
+        if label_type not in ("node", "graph"):
+            raise ValueError("Nepoznat tip oznake")
+        if aggregation not in ("mean", "distance"):
+            raise ValueError(f"Nepoznata agregacija: {aggregation}")
+        self.params = params
+        self.label_type = label_type
+        self.aggregation = aggregation
+        self.scale = float(scale)
+        self.num_layers = sum(1 for name in params if name.startswith("W_self_"))
+
+    @classmethod
+    def create(cls, hidden=32, layers=3, label_type="node", aggregation="mean", scale=10.0, seed=None):
+        """Random (Glorot) message-passing weights, zero readout."""
+        rng = np.random.default_rng(seed)
+        params = {}
+        in_dim = 3
+        for l in range(layers):
+            limit = np.sqrt(6.0 / (in_dim + hidden))
+            params[f"W_self_{l}"] = rng.uniform(-limit, limit, (in_dim, hidden)).astype(np.float32)
+            params[f"W_neigh_{l}"] = rng.uniform(-limit, limit, (in_dim, hidden)).astype(np.float32)
+            params[f"b_{l}"] = np.zeros(hidden, dtype=np.float32)
+            in_dim = hidden
+        params["W_out"] = np.zeros((in_dim, 2), dtype=np.float32)
+        params["b_out"] = np.zeros(2, dtype=np.float32)
+        return cls(params, label_type=label_type, aggregation=aggregation, scale=scale)
+
+    # ---------------- persistence ----------------
+    def save(self, path):
+        meta = {"label_type": self.label_type, "aggregation": self.aggregation, "scale": self.scale}
+        np.savez(path, __meta__=np.array(json.dumps(meta)), **self.params)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["__meta__"]))
+            params = {name: data[name] for name in data.files if name != "__meta__"}
+        return cls(params, **meta)
+
+    # ---------------- forward ----------------
+    def _edge_weights(self, batch):
+        indptr = batch["indptr"]
+        degree = np.diff(indptr)
+        if self.aggregation == "mean":
+            w = 1.0 / np.maximum(degree, 1)
+            return np.repeat(w, degree).astype(np.float32)
+        inv = 1.0 / batch["edge_dist"].astype(np.float32)
+        norm = segment_sum(inv, indptr)
+        return inv / np.repeat(np.maximum(norm, 1e-12), degree)
+
+    def features(self, batch):
+        return np.concatenate([batch["x"], batch["positions"] / self.scale], axis=1).astype(np.float32)
+
+    def layer(self, l, h, agg):
+        """One message-passing layer given own features and aggregated neighbour features."""
+        out = h @ self.params[f"W_self_{l}"] + agg @ self.params[f"W_neigh_{l}"] + self.params[f"b_{l}"]
+        return np.maximum(out, 0.0, out=out)
+
+    def embed(self, batch):
+        """Final-layer node embeddings for a collated batch."""
+        indptr, indices = batch["indptr"], batch["indices"]
+        w = self._edge_weights(batch)[:, None]
+        h = self.features(batch)
+        for l in range(self.num_layers):
+            h = self.layer(l, h, segment_sum(h[indices] * w, indptr))
+        return h
+
+    # ---------------- single node (distributed execution) ----------------
+    def node_features(self, x, position):
+        """
+        Input vector of one node, same as features() for a batch given the same
+        position (JSON INIT rounds positions to 2 decimals, binary INIT sends float32).
+        """
+        return np.concatenate([[x], np.asarray(position, dtype=np.float64) / self.scale]).astype(np.float32)
+
+    def node_layer(self, l, h, neighbour_h):
+        """
+        Layer `l` on one node from the hidden vectors its neighbours sent
+        (list of arrays). Mean aggregation only, over the neighbours that reported.
+        Matches layer() in embed() up to float32 rounding when all neighbours
+        reported; hidden vectors that went over the radio as float16 (too long
+        for one float32 frame) add about 1e-3 relative error per layer.
+        """
+        if self.aggregation != "mean":
+            raise ValueError("Distributed execution supports aggregation='mean' only")
+        if neighbour_h:
+            agg = np.mean(np.stack(neighbour_h).astype(np.float32), axis=0)
+        else:
+            agg = np.zeros_like(h)
+        return self.layer(l, h[None], agg[None])[0]
+
+    def node_readout(self, h):
+        """Per-node prediction (relative vector to the source) from the final hidden vector."""
+        if self.label_type != "node":
+            raise ValueError("Distributed readout needs label_type='node'")
+        return h @ self.params["W_out"] + self.params["b_out"]
+
+    def _readout_input(self, batch):
+        h = self.embed(batch)
+        if self.label_type == "graph":
+            h = graph_mean(h, batch["node_ptr"])
+        return h
+
+    def forward(self, batch):
+        """Predictions: (total_nodes, 2) for node labels, (num_graphs, 2) for graph labels."""
+        return self._readout_input(batch) @ self.params["W_out"] + self.params["b_out"]
+
+    # ---------------- readout fitting ----------------
+    def fit_readout(self, batches, ridge=1e-3):
+        """
+        Closed-form ridge regression of the readout on the (fixed) message-passing
+        embeddings. No deep-learning framework needed; the hidden layers act as
+        random graph features unless trained weights were loaded.
+        """
+        dim = self.params["W_out"].shape[0] + 1
+        gram = np.zeros((dim, dim))
+        cross = np.zeros((dim, 2))
+        for batch in batches:
+            h = self._readout_input(batch).astype(np.float64)
+            h = np.concatenate([h, np.ones((len(h), 1))], axis=1)
+            gram += h.T @ h
+            cross += h.T @ batch["y"].astype(np.float64)
+        sol = np.linalg.solve(gram + ridge * np.eye(dim), cross)
+        self.params["W_out"] = sol[:-1].astype(np.float32)
+        self.params["b_out"] = sol[-1].astype(np.float32)
+        return self
+
+    def evaluate(self, batches):
+        """Mean Euclidean error of the predictions and inference throughput (graphs/s)."""
+        err_sum, err_count, graphs, elapsed = 0.0, 0, 0, 0.0
+        for batch in batches:
+            t0 = time.perf_counter()
+            pred = self.forward(batch)
+            elapsed += time.perf_counter() - t0
+            err = np.linalg.norm(pred - batch["y"], axis=1)
+            err_sum += float(err.sum())
+            err_count += len(err)
+            graphs += batch["num_graphs"]
+        return {
+            "mean_error": err_sum / max(err_count, 1),
+            "graphs": graphs,
+            "graphs_per_s": graphs / elapsed if elapsed > 0 else float("inf"),
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--label_type", choices=["node", "graph"], default="node")
+    ap.add_argument("--aggregation", choices=["mean", "distance"], default="mean")
+    ap.add_argument("--nodes", type=int, nargs="+", default=[5], help="N or MIN MAX")
+    ap.add_argument("--hidden", type=int, default=32)
+    ap.add_argument("--layers", type=int, default=3)
+    ap.add_argument("--train_graphs", type=int, default=20000)
+    ap.add_argument("--test_graphs", type=int, default=20000)
+    ap.add_argument("--batch_size", type=int, default=4096)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--save", default=None, help="write the fitted model to this .npz")
+    args = ap.parse_args()
+
+    node_size = args.nodes[0] if len(args.nodes) == 1 else tuple(args.nodes[:2])
+
+    def loader(num_graphs, seed):
+        dataset = SignalGraphDataset(node_size=node_size, label_type=args.label_type, seed=seed)
+        return PrefetchLoader(dataset, batch_size=args.batch_size, num_graphs=num_graphs)
+
+    model = GNNModel.create(hidden=args.hidden, layers=args.layers, label_type=args.label_type,
+                            aggregation=args.aggregation, seed=args.seed)
+    model.fit_readout(loader(args.train_graphs, args.seed + 1))
+    stats = model.evaluate(loader(args.test_graphs, args.seed + 2))
+
+    print(f"[GNN] label_type={args.label_type} layers={args.layers} hidden={args.hidden}")
+    print(f"[GNN] mean localization error={stats['mean_error']:.3f} over {stats['graphs']} graphs")
+    print(f"[GNN] inference {stats['graphs_per_s']:.0f} graphs/s")
+
+    if args.save:
+        model.save(args.save)
+        print(f"[GNN] saved to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
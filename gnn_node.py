@@ -9,6 +9,8 @@ from digi.xbee.devices import DigiMeshDevice
 from digi.xbee.models.address import XBee64BitAddress
 from digi.xbee.exception import TransmitException
 
+from sim_device import SimXBeeDevice
+
 
 class MeshNodeTiny:
     """
@@ -28,6 +30,7 @@ class MeshNodeTiny:
         id_to_addr: Dict[str, str],   # NodeID -> 64-bit hex string (16 hex chars)
         routes: Dict[str, str],       # DestID -> NextHopID
         ack_enabled: bool = True,
+        device=None,
     ):
         self.port = port
         self.baud = baud
@@ -36,7 +39,8 @@ class MeshNodeTiny:
         self.routes = routes
         self.ack_enabled = ack_enabled
 
-        self.device = DigiMeshDevice(self.port, self.baud)
+        # device given -> e.g. SimXBeeDevice (--sim)
+        self.device = device if device is not None else DigiMeshDevice(self.port, self.baud)
 
         self._lock = threading.Lock()
         self._cv = threading.Condition(self._lock)
@@ -205,7 +209,7 @@ def load_config(path: str) -> Dict[str, Any]:
         return json.load(f)
 
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--port", required=True, help="npr. /dev/ttyUSB0")
     ap.add_argument("--baud", type=int, default=9600)
@@ -216,7 +220,8 @@ def main():
     ap.add_argument("--message", help="Message text (send mode)")
     ap.add_argument("--timeout", type=float, default=4.0)
     ap.add_argument("--no-ack", action="store_true")
-    args = ap.parse_args()
+    ap.add_argument("--sim", action="store_true", help="simulated radio (sim_device.py, UDP on localhost) instead of a serial XBee")
+    args = ap.parse_args(argv)
 
     cfg = load_config(args.config)
     id_to_addr = cfg["id_to_addr"]
@@ -230,6 +235,7 @@ def main():
         id_to_addr=id_to_addr,
         routes=my_routes,
         ack_enabled=(not args.no_ack),
+        device=SimXBeeDevice(args.port, args.baud, addr64=id_to_addr[args.id]) if args.sim else None,
     )
 
     node.start()
@@ -6,10 +6,13 @@ import threading
 from digi.xbee.devices import DigiMeshDevice
 from digi.xbee.models.address import XBee64BitAddress
 
+from sim_device import SimXBeeDevice
+
 
 class Node:
-    def __init__(self, port: str, baud: int):
-        self.device = DigiMeshDevice(port, baud)
+    def __init__(self, port: str, baud: int, device=None):
+        # device = npr. SimXBeeDevice (--sim), inace pravi DigiMesh modul
+        self.device = device if device is not None else DigiMeshDevice(port, baud)
 
         self._lock = threading.Lock()
         self.last_messages = []   
@@ -77,15 +80,16 @@ class Node:
         return False
 
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--port", required=True)
     ap.add_argument("--baud", type=int, default=9600)
     ap.add_argument("--peer64", required=True)
     ap.add_argument("--mode", choices=["listen", "ping"], required=True)
-    args = ap.parse_args()
+    ap.add_argument("--sim", action="store_true", help="simulirani radio (sim_device.py, UDP na localhostu) umjesto XBee na serijskom portu")
+    args = ap.parse_args(argv)
 
-    node = Node(args.port, args.baud)
+    node = Node(args.port, args.baud, device=SimXBeeDevice(args.port, args.baud) if args.sim else None)
     node.start()
     try:
         if args.mode == "listen":
@@ -0,0 +1,441 @@
+import argparse
+import heapq
+import json
+import os
+import random
+import socket
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from digi.xbee.exception import TransmitException
+from digi.xbee.models.address import XBee64BitAddress
+from digi.xbee.models.message import XBeeMessage
+from digi.xbee.models.status import TransmitStatus
+
+# API frame + MAC/NWK header bytes sent on air around the RF payload
+FRAME_OVERHEAD_BYTES = 18
+
+
+class SimRemoteDevice:
+    """Sender handle attached to received messages (xbee_message.remote_device)."""
+
+    def __init__(self, addr64: XBee64BitAddress):
+        self._addr64 = addr64
+
+    def get_64bit_addr(self) -> XBee64BitAddress:
+        return self._addr64
+
+
+class SimMedium:
+    """
+    Shared in-memory radio medium for SimXBeeDevice:
+    - per-link latency (s) and loss probability, with medium-wide defaults
+    - airtime model: (payload + FRAME_OVERHEAD_BYTES) * 10 bits at `baud`,
+      the sender blocks for it like it blocks for the TX status on hardware
+    - unicast loss or closed destination -> TransmitException(NO_ACK),
+      unknown destination -> ADDRESS_NOT_FOUND, broadcast loss is silent
+    - deliveries run on one dispatcher thread, like the digi callback thread
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.01,
+        loss: float = 0.0,
+        baud: int = 9600,
+        max_payload: int = 84,
+        shared_channel: bool = False,
+        seed: Optional[int] = None,
+    ):
+        self.latency_s = float(latency_s)
+        self.loss = float(loss)
+        self.baud = int(baud)
+        self.max_payload = int(max_payload)
+        self.shared_channel = shared_channel
+
+        self._rng = random.Random(seed)
+        self._devices: Dict[str, "SimXBeeDevice"] = {}
+        self._links: Dict[Tuple[str, str], Tuple[Optional[float], Optional[float]]] = {}
+
+        self._lock = threading.Lock()
+        self._channel = threading.Lock()  # only used with shared_channel=True
+        self._cv = threading.Condition()
+        self._queue = []
+        self._seq = 0
+        self._thread = None
+
+    # ---------------- configuration ----------------
+    def set_link(self, a: str, b: str, latency_s: Optional[float] = None,
+                 loss: Optional[float] = None, symmetric: bool = True):
+        a, b = a.upper(), b.upper()
+        self._links[(a, b)] = (latency_s, loss)
+        if symmetric:
+            self._links[(b, a)] = (latency_s, loss)
+
+    def _link(self, a: str, b: str) -> Tuple[float, float]:
+        latency_s, loss = self._links.get((a, b), (None, None))
+        return (self.latency_s if latency_s is None else latency_s,
+                self.loss if loss is None else loss)
+
+    def airtime(self, nbytes: int) -> float:
+        return (nbytes + FRAME_OVERHEAD_BYTES) * 10.0 / self.baud
+
+    # ---------------- devices ----------------
+    def register(self, device: "SimXBeeDevice"):
+        with self._lock:
+            self._devices[str(device.get_64bit_addr()).upper()] = device
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, daemon=True)
+                self._thread.start()
+
+    # ---------------- transmission ----------------
+    def _targets(self, src64: str, dst64: Optional[str], data: bytes):
+        if len(data) > self.max_payload:
+            raise TransmitException(transmit_status=TransmitStatus.PAYLOAD_TOO_LARGE)
+        with self._lock:
+            if dst64 is None:
+                return [d for a, d in self._devices.items() if a != src64]
+            target = self._devices.get(dst64.upper())
+            if target is None:
+                raise TransmitException(transmit_status=TransmitStatus.ADDRESS_NOT_FOUND)
+            return [target]
+
+    def transmit(self, src: "SimXBeeDevice", dst64: Optional[str], data: bytes):
+        """Unicast to `dst64`, or broadcast when `dst64` is None."""
+        src64 = str(src.get_64bit_addr()).upper()
+        targets = self._targets(src64, dst64, data)
+
+        airtime = self.airtime(len(data))
+        if self.shared_channel:
+            with self._channel:
+                time.sleep(airtime)
+        else:
+            time.sleep(airtime)
+
+        delivered = False
+        now = time.monotonic()
+        for dev in targets:
+            latency_s, loss = self._link(src64, str(dev.get_64bit_addr()).upper())
+            if not dev.is_open() or self._rng.random() < loss:
+                continue
+            msg = XBeeMessage(bytes(data), SimRemoteDevice(src.get_64bit_addr()), time.time() + latency_s, dst64 is None)
+            self._schedule(now + latency_s, dev, msg)
+            delivered = True
+
+        if dst64 is not None:
+            if not delivered:
+                raise TransmitException(transmit_status=TransmitStatus.NO_ACK)
+            # unicast TX status arrives after the frame (and its ACK) got through
+            time.sleep(self._link(src64, dst64.upper())[0])
+
+    def _schedule(self, at: float, dev: "SimXBeeDevice", msg: XBeeMessage):
+        with self._cv:
+            self._seq += 1
+            heapq.heappush(self._queue, (at, self._seq, dev, msg))
+            self._cv.notify()
+
+    def _dispatch(self):
+        while True:
+            with self._cv:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    timeout = self._queue[0][0] - time.monotonic() if self._queue else None
+                    self._cv.wait(timeout=timeout)
+                _, _, dev, msg = heapq.heappop(self._queue)
+            dev._deliver(msg)
+
+
+class UdpMedium(SimMedium):
+    """
+    SimMedium across processes on one machine, so scripts started on their own
+    with --sim hear each other:
+    - every opened device binds a UDP socket on 127.0.0.1 and writes its port
+      to `registry_dir`/<addr64> (shared by all processes)
+    - the sender applies the link model (airtime, loss, latency travels in the
+      datagram and the receiver delays delivery by it)
+    - unicast waits for the receiver's ack: a closed radio or a stopped
+      process -> TransmitException(NO_ACK) after ack_timeout_s, an address
+      never registered -> ADDRESS_NOT_FOUND; broadcast goes to every registered port
+    """
+
+    _DGRAM = struct.Struct(">BIQ?d")  # kind, seq, source addr64, broadcast, latency
+    _DATA, _ACK = 0, 1
+
+    def __init__(self, registry_dir: Optional[str] = None, ack_timeout_s: float = 0.5, **kwargs):
+        super().__init__(**kwargs)
+        self.registry_dir = registry_dir or os.path.join(tempfile.gettempdir(), "xbee_sim")
+        self.ack_timeout_s = float(ack_timeout_s)
+        self._socks: Dict[str, socket.socket] = {}
+        self._acks: Dict[int, threading.Event] = {}
+
+    def register(self, device: "SimXBeeDevice"):
+        addr64 = str(device.get_64bit_addr()).upper()
+        with self._lock:
+            registered = addr64 in self._socks
+        if not registered:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("127.0.0.1", 0))
+            with self._lock:
+                self._socks[addr64] = sock
+            threading.Thread(target=self._receive, args=(device, sock), daemon=True).start()
+            os.makedirs(self.registry_dir, exist_ok=True)
+            tmp = os.path.join(self.registry_dir, f".{addr64}.{os.getpid()}")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(str(sock.getsockname()[1]))
+            os.replace(tmp, os.path.join(self.registry_dir, addr64))
+        super().register(device)
+
+    def _ports(self) -> Dict[str, int]:
+        ports = {}
+        for name in os.listdir(self.registry_dir):
+            if name.startswith("."):
+                continue
+            try:
+                with open(os.path.join(self.registry_dir, name), encoding="utf-8") as f:
+                    ports[name] = int(f.read())
+            except (OSError, ValueError):
+                pass
+        return ports
+
+    def transmit(self, src: "SimXBeeDevice", dst64: Optional[str], data: bytes):
+        """Unicast to `dst64`, or broadcast when `dst64` is None."""
+        if len(data) > self.max_payload:
+            raise TransmitException(transmit_status=TransmitStatus.PAYLOAD_TOO_LARGE)
+        src64 = str(src.get_64bit_addr()).upper()
+        ports = self._ports()
+        if dst64 is None:
+            targets = {a: p for a, p in ports.items() if a != src64}
+        elif dst64.upper() in ports:
+            targets = {dst64.upper(): ports[dst64.upper()]}
+        else:
+            raise TransmitException(transmit_status=TransmitStatus.ADDRESS_NOT_FOUND)
+
+        airtime = self.airtime(len(data))
+        if self.shared_channel:
+            with self._channel:
+                time.sleep(airtime)
+        else:
+            time.sleep(airtime)
+
+        with self._lock:
+            self._seq += 1
+            seq = self._seq & 0xFFFFFFFF
+            sock = self._socks[src64]
+            ack = self._acks[seq] = threading.Event()
+        sent = False
+        try:
+            for addr, port in targets.items():
+                latency_s, loss = self._link(src64, addr)
+                if self._rng.random() < loss:
+                    continue
+                header = self._DGRAM.pack(self._DATA, seq, int(src64, 16), dst64 is None, latency_s)
+                try:
+                    sock.sendto(header + bytes(data), ("127.0.0.1", port))
+                    sent = True
+                except OSError:
+                    pass
+            if dst64 is not None:
+                latency_s = self._link(src64, dst64.upper())[0]
+                if not sent or not ack.wait(latency_s + self.ack_timeout_s):
+                    raise TransmitException(transmit_status=TransmitStatus.NO_ACK)
+                time.sleep(latency_s)
+        finally:
+            with self._lock:
+                self._acks.pop(seq, None)
+
+    def _receive(self, device: "SimXBeeDevice", sock: socket.socket):
+        while True:
+            packet, peer = sock.recvfrom(65535)
+            if len(packet) < self._DGRAM.size:
+                continue
+            kind, seq, src, broadcast, latency_s = self._DGRAM.unpack_from(packet)
+            if kind == self._ACK:
+                with self._lock:
+                    ack = self._acks.get(seq)
+                if ack is not None:
+                    ack.set()
+                continue
+            if not device.is_open():
+                continue  # closed radio: no ack, the sender gets NO_ACK
+            if not broadcast:
+                sock.sendto(self._DGRAM.pack(self._ACK, seq, 0, False, 0.0), peer)
+            remote = SimRemoteDevice(XBee64BitAddress.from_hex_string(f"{src:016X}"))
+            msg = XBeeMessage(packet[self._DGRAM.size:], remote, time.time() + latency_s, broadcast)
+            self._schedule(time.monotonic() + latency_s, device, msg)
+
+
+# medium shared by every SimXBeeDevice created without an explicit one (--sim):
+# UDP on localhost so separately started scripts share it; sim_device.main
+# swaps in an in-process SimMedium for the all-in-one run
+DEFAULT_MEDIUM = UdpMedium()
+
+
+def sim_addr_for(name: str) -> str:
+    """Stable fake 64-bit address for a port name (nodes without a configured address)."""
+    return f"0013A2FF{zlib.crc32(name.encode('utf-8')):08X}"
+
+
+class SimXBeeDevice:
+    """
+    Drop-in replacement for ZigBeeDevice / DigiMeshDevice covering what the
+    node scripts use: open/close/is_open, add_data_received_callback,
+    send_data_64, send_data_64_16, send_data_broadcast, get_parameter("NP"),
+    get_64bit_addr, get_node_id.
+    """
+
+    def __init__(self, port: str, baud: int, medium: Optional[SimMedium] = None, addr64: Optional[str] = None):
+        self.port = port
+        self.baud = baud
+        self.medium = medium if medium is not None else DEFAULT_MEDIUM
+        self._addr64 = XBee64BitAddress.from_hex_string(addr64 or sim_addr_for(port))
+        self._callbacks = []
+        self._open = False
+
+    def open(self):
+        self._open = True
+        self.medium.register(self)
+
+    def close(self):
+        # stays registered: frames to a closed radio are lost (NO_ACK), like a powered-off module
+        self._open = False
+
+    def is_open(self) -> bool:
+        return self._open
+
+    def add_data_received_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def del_data_received_callback(self, callback):
+        if callback in self._callbacks:
+            self._callbacks.remove(callback)
+
+    def get_64bit_addr(self) -> XBee64BitAddress:
+        return self._addr64
+
+    def get_node_id(self) -> str:
+        return f"SIM-{self.port}"
+
+    def get_parameter(self, parameter: str):
+        if parameter == "NP":
+            return self.medium.max_payload.to_bytes(2, byteorder="big")
+        return None
+
+    def set_sync_ops_timeout(self, timeout):
+        pass
+
+    def send_data_64(self, addr64, data):
+        self.medium.transmit(self, str(addr64), bytes(data))
+
+    def send_data_64_16(self, addr64, addr16, data):
+        self.medium.transmit(self, str(addr64), bytes(data))
+
+    def send_data_broadcast(self, data, transmit_options=0):
+        self.medium.transmit(self, None, bytes(data))
+
+    def _deliver(self, msg: XBeeMessage):
+        if not self._open:
+            return
+        for callback in list(self._callbacks):
+            try:
+                callback(msg)
+            except Exception as e:
+                print(f"[SIM] callback error on {self._addr64}: {e}")
+
+
+def main():
+    """Hardware-free run: central node + N consensus nodes as threads over one SimMedium."""
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=5)
+    ap.add_argument("--variant", choices=["zigbee", "digi"], default="zigbee")
+    ap.add_argument("--latency", type=float, default=0.01, help="per-link latency (s)")
+    ap.add_argument("--loss", type=float, default=0.0, help="per-frame loss probability")
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--max_payload", type=int, default=84, help="NP reported by the simulated firmware")
+    ap.add_argument("--shared_channel", action="store_true", help="one transmission at a time on the whole medium")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--iters", type=int, default=60)
+    ap.add_argument("--sigma", type=float, default=0.1)
+    ap.add_argument("--timeout", type=float, default=2.0)
+    ap.add_argument("--topology", choices=["random", "radius", "knn"], default="knn")
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--radius", type=float, default=3.0)
+    ap.add_argument("--wire", choices=["binary", "json"], default="binary")
+    ap.add_argument("--tx", choices=["unicast", "broadcast"], default="unicast")
+    ap.add_argument("--repair_after", type=float, default=None)
+    ap.add_argument("--mode", choices=["consensus", "push_sum"], default="consensus")
+    ap.add_argument("--period", type=float, default=0.2)
+    ap.add_argument("--localize", action="store_true", help="in-network source localization")
+    ap.add_argument("--sessions", type=int, default=1, help="graphs run back-to-back by one central / node process")
+    ap.add_argument("--track", action="store_true", help="nodes take new readings and track the running average")
+    ap.add_argument("--sample_period", type=float, default=1.0)
+    ap.add_argument("--drift", type=float, default=0.05)
+    args = ap.parse_args()
+
+    if args.variant == "zigbee":
+        import central_node_zigbee as central_mod
+        import consensus_node_zigbee as node_mod
+    else:
+        import central_node_digi as central_mod
+        import consensus_node_digi as node_mod
+
+    # the node scripts import this module by name, so set DEFAULT_MEDIUM on
+    # that instance (not the __main__ copy); all threads share one in-process medium
+    import sim_device
+    medium = sim_device.DEFAULT_MEDIUM = SimMedium(
+        latency_s=args.latency,
+        loss=args.loss,
+        baud=args.baud,
+        max_payload=args.max_payload,
+        shared_channel=args.shared_channel,
+        seed=args.seed,
+    )
+
+    from dataset import node_labels
+    ids = node_labels(args.nodes)
+    config = {"id_to_addr": {nid: sim_addr_for(f"node-{nid}") for nid in ids}}
+    fd, config_path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    # central sends INIT one node at a time (airtime + 0.1 s pause each)
+    init_timeout = 30.0 + args.nodes * (0.2 + medium.airtime(medium.max_payload) + 2 * medium.latency_s)
+    common = ["--sim", "--config", config_path, "--baud", str(args.baud), "--wire", args.wire]
+    threads = []
+    for nid in ids:
+        argv = common + ["--id", nid, "--port", f"sim-{nid}", "--iters", str(args.iters),
+                         "--sigma", str(args.sigma), "--timeout", str(args.timeout),
+                         "--init_timeout", str(init_timeout), "--tx", args.tx,
+                         "--mode", args.mode, "--period", str(args.period)]
+        if args.repair_after is not None:
+            argv += ["--repair_after", str(args.repair_after)]
+        if args.localize:
+            argv += ["--localize"]
+        if args.sessions > 1:
+            argv += ["--loop"]
+        if args.track:
+            argv += ["--track", "--sample_period", str(args.sample_period), "--drift", str(args.drift)]
+        threads.append(threading.Thread(target=node_mod.main, args=(argv,), name=f"node-{nid}"))
+
+    central_argv = common + ["--port", "sim-central", "--start_delay", "1", "--no_plot", "--connected", "repair",
+                             "--topology", args.topology, "--k", str(args.k), "--radius", str(args.radius)]
+    if args.localize:
+        central_argv += ["--localize"]
+    if args.sessions > 1:
+        central_argv += ["--sessions", str(args.sessions)]
+    threads.append(threading.Thread(target=central_mod.main, args=(central_argv,), name="central"))
+
+    t0 = time.time()
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        os.unlink(config_path)
+    print(f"[SIM] {args.nodes} nodes finished in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# moduli su u korijenu repozitorija (nema paketa)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from batching import PrefetchLoader, collate, collate_padded
+from dataset import SignalGraphDataset
+
+
+def _assert_same_batch(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        np.testing.assert_array_equal(a[name], b[name], err_msg=name)
+
+
+@pytest.mark.parametrize("label_type", ["node", "graph"])
+def test_collate_matches_collate_padded(label_type):
+    padded = SignalGraphDataset(node_size=(3, 9), label_type=label_type, seed=21).getGraphs(7)
+    ds = SignalGraphDataset(node_size=(3, 9), label_type=label_type, seed=21)
+    graphs = [ds.getGraph() for _ in range(7)]
+    _assert_same_batch(collate(graphs), collate_padded(padded))
+
+
+def test_collate_is_block_diagonal():
+    ds = SignalGraphDataset(node_size=(3, 6), sparse=True, seed=22)
+    graphs = [ds.getGraph() for _ in range(5)]
+    batch = collate(graphs)
+    rows = np.repeat(np.arange(len(batch["batch"])), np.diff(batch["indptr"]))
+    assert np.all(batch["batch"][rows] == batch["batch"][batch["indices"]])
+    np.testing.assert_array_equal(np.bincount(batch["batch"]), [G["num_nodes"] for G in graphs])
+
+
+def test_prefetch_loader_keeps_order():
+    ds = SignalGraphDataset(node_size=(3, 6), sparse=True, seed=23)
+    graphs = [ds.getGraph() for _ in range(10)]
+    loader = PrefetchLoader(graphs, batch_size=4, workers=2, prefetch=2)
+    batches = list(loader)
+    assert len(batches) == len(loader) == 3
+    for s, batch in zip(range(0, 10, 4), batches):
+        _assert_same_batch(batch, collate(graphs[s:s + 4]))
+
+
+def test_generated_batches_cover_num_graphs():
+    loader = PrefetchLoader(SignalGraphDataset(node_size=5, seed=24), batch_size=4, num_graphs=10)
+    assert len(loader) == 3
+    assert [b["num_graphs"] for b in loader] == [4, 4, 2]
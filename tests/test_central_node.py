@@ -0,0 +1,41 @@
+import json
+
+import pytest
+
+import central_node_digi
+import central_node_zigbee
+from wire_codec import WireCodec
+
+ID_TO_ADDR = {"A": "0013A20000000001", "B": "0013A20000000002"}
+NODES_CFG = {"A": {"neighbours": ["B"], "value": 0.25}, "B": {"neighbours": ["A"], "value": 0.75}}
+
+
+class _Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def send_data_64(self, addr, data):
+        self.calls.append(("64", str(addr), data))
+
+    def send_data_64_16(self, addr, addr16, data):
+        self.calls.append(("64_16", str(addr), data))
+
+
+@pytest.mark.parametrize("mod,call", [(central_node_digi, "64"), (central_node_zigbee, "64_16")])
+def test_send_init_uses_the_firmware_unicast(mod, call):
+    device = _Recorder()
+    delivered = mod.send_init(device, ID_TO_ADDR, NODES_CFG, codec=WireCodec(ID_TO_ADDR), session=9, sleep=lambda s: None)
+    assert delivered == ["A", "B"]
+    assert [(c, a) for c, a, _ in device.calls] == [(call, ID_TO_ADDR["A"]), (call, ID_TO_ADDR["B"])]
+    msg = WireCodec(ID_TO_ADDR).decode(device.calls[1][2])
+    assert msg["n"] == ["A"] and msg["sid"] == 9
+
+
+def test_json_init_over_np_is_not_sent():
+    device = _Recorder()
+    cfg = {"A": {"neighbours": ["B"], "value": [0.1] * 20}}
+    assert central_node_digi.send_init(device, ID_TO_ADDR, cfg, max_payload=84, sleep=lambda s: None) == []
+    assert device.calls == []
+    cfg = {"A": {"neighbours": ["B"], "value": 1 / 3}}
+    assert central_node_digi.send_init(device, ID_TO_ADDR, cfg, max_payload=84, sleep=lambda s: None) == ["A"]
+    assert json.loads(device.calls[0][2])["v"] == pytest.approx(1 / 3, rel=1e-6)
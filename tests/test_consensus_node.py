@@ -0,0 +1,90 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+from digi.xbee.models.address import XBee64BitAddress
+from digi.xbee.models.message import XBeeMessage
+
+import consensus_node
+from batching import collate
+from dataset import SignalGraphDataset
+from gnn_model import GNNModel
+from sim_device import SimMedium, SimRemoteDevice, SimXBeeDevice, sim_addr_for
+
+
+def _node(node_id, id_to_addr, medium, **kwargs):
+    device = SimXBeeDevice(f"sim-{node_id}", 9600, medium=medium, addr64=id_to_addr[node_id])
+    return consensus_node.ConsensusNode(node_id=node_id, port=f"sim-{node_id}", baud=9600, id_to_addr=id_to_addr,
+                                        neighbors=[], value0=0.0, sigma=0.1, num_iterations=1,
+                                        wait_timeout_s=1.0, device=device, **kwargs)
+
+
+def test_base_node_unicasts_with_send_data_64():
+    medium = SimMedium(latency_s=0.0)
+    id_to_addr = {nid: sim_addr_for(f"node-{nid}") for nid in "AB"}
+    got = threading.Event()
+    peer = SimXBeeDevice("sim-B", 9600, medium=medium, addr64=id_to_addr["B"])
+    peer.open()
+    peer.add_data_received_callback(lambda msg: got.set())
+    node = _node("A", id_to_addr, medium)
+    node.device.open()
+    assert node.send_value(0, "B", 0.5)
+    assert got.wait(1.0)
+
+
+def test_main_needs_a_firmware_class():
+    with pytest.raises(TypeError):
+        consensus_node.main(["--id", "A"])
+
+
+def test_hidden_vector_of_another_session_is_dropped():
+    id_to_addr = {nid: sim_addr_for(f"node-{nid}") for nid in "AB"}
+    node = _node("A", id_to_addr, SimMedium())
+    node.session = 5
+    node._init_event.set()
+    remote = SimRemoteDevice(XBee64BitAddress.from_hex_string(id_to_addr["B"]))
+    for sid in (4, 5):
+        data = node.codec.encode_hidden(0, 0, 1, np.full(4, sid, dtype=">f4").tobytes(), wide=True, session=sid)
+        node._on_rx(XBeeMessage(data, remote, 0.0))
+    np.testing.assert_array_equal(node._complete_hidden(0)["B"], np.full(4, 5.0))
+
+
+def test_gnn_over_the_radio_matches_batched_forward():
+    # INITs go out one at a time (as from the central), so early nodes send layer 0
+    # before their neighbours are initialised; every node must still use all neighbours
+    G = SignalGraphDataset(node_size=6, topology="knn", k=2, seed=4, sparse=True).getGraph()
+    batch = collate([G])
+    model = GNNModel.create(hidden=16, layers=3, seed=1)
+    model.params["W_out"] = np.random.default_rng(2).normal(size=model.params["W_out"].shape).astype(np.float32)
+    expected = batch["positions"] + model.forward(batch)
+
+    medium = SimMedium(latency_s=0.005, max_payload=84)
+    ids = [str(i) for i in range(6)]
+    id_to_addr = {nid: sim_addr_for(f"node-{nid}") for nid in ids}
+    nodes = [_node(nid, id_to_addr, medium, model=model) for nid in ids]
+    for node in nodes:
+        node.wait_timeout_s, node.init_timeout_s = 0.3, 10.0
+    est = {}
+
+    def run(i):
+        nodes[i].start()
+        est[i] = nodes[i].run_gnn()
+        nodes[i].stop()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(6)]
+    for t in threads:
+        t.start()
+    central = SimXBeeDevice("sim-central", 9600, medium=medium)
+    central.open()
+    indptr, indices = batch["indptr"], batch["indices"]
+    for i in range(6):
+        neigh = [ids[j] for j in indices[indptr[i]:indptr[i + 1]]]
+        data = nodes[i].codec.encode_init(neigh, float(batch["x"][i, 0]), position=batch["positions"][i], session=7)
+        central.send_data_64(XBee64BitAddress.from_hex_string(id_to_addr[ids[i]]), data)
+        time.sleep(0.4)
+    for t in threads:
+        t.join(timeout=30)
+
+    assert sorted(est) == list(range(6))
+    np.testing.assert_allclose(np.stack([est[i] for i in range(6)]), expected, rtol=1e-4, atol=1e-4)
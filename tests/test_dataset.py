@@ -0,0 +1,194 @@
+import numpy as np
+import pytest
+
+from dataset_store import ShardedGraphDataset, ShardWriter
+from dataset import (
+    SignalGraphDataset,
+    add_consensus_weights,
+    algebraic_connectivity,
+    connect_components,
+    connected_components,
+    consensus_rate,
+    consensus_weights,
+    generate_chunks,
+    knn_edges,
+    radius_edges,
+)
+
+
+def _edge_set(ei, ej):
+    return set(zip(ei.tolist(), ej.tolist()))
+
+
+def test_radius_edges_match_brute_force():
+    positions = np.random.default_rng(0).random((60, 2)) * 10.0
+    ei, ej = radius_edges(positions, 2.0)
+    dist = np.linalg.norm(positions[:, None] - positions[None], axis=-1)
+    iu, ju = np.nonzero(np.triu(dist <= 2.0, k=1))
+    assert _edge_set(ei, ej) == _edge_set(iu, ju)
+
+
+def test_knn_edges_give_every_node_k_neighbours():
+    positions = np.random.default_rng(1).random((40, 2)) * 10.0
+    ei, ej = knn_edges(positions, 3)
+    assert np.all(ei < ej)
+    degree = np.bincount(np.concatenate([ei, ej]), minlength=40)
+    assert degree.min() >= 3
+    dist = np.linalg.norm(positions[:, None] - positions[None], axis=-1)
+    np.fill_diagonal(dist, np.inf)
+    edges = _edge_set(ei, ej)
+    for i, j in enumerate(np.argmin(dist, axis=1)):
+        assert (min(i, j), max(i, j)) in edges
+
+
+def test_connected_components_and_repair():
+    # two triangles and an isolated node
+    ei = np.array([0, 1, 0, 3, 4, 3])
+    ej = np.array([1, 2, 2, 4, 5, 5])
+    roots = connected_components(7, ei, ej)
+    assert len(set(roots.tolist())) == 3
+    assert roots[0] == roots[1] == roots[2] and roots[3] == roots[4] == roots[5]
+
+    positions = np.random.default_rng(2).random((7, 2))
+    ei2, ej2 = connect_components(positions, ei, ej, roots)
+    assert len(ei2) == len(ei) + 2
+    roots2 = connected_components(7, ei2, ej2)
+    assert np.all(roots2 == roots2[0])
+
+
+def test_algebraic_connectivity():
+    # path of n nodes: lambda_2 = 2 - 2 cos(pi / n)
+    n = 6
+    ei, ej = np.arange(n - 1), np.arange(1, n)
+    assert algebraic_connectivity(n, ei, ej) == pytest.approx(2 - 2 * np.cos(np.pi / n))
+    assert algebraic_connectivity(n, ei[:2], ej[:2]) == pytest.approx(0.0, abs=1e-12)
+    assert algebraic_connectivity(1, ei[:0], ej[:0]) == 0.0
+
+
+@pytest.mark.parametrize("mode", ["reject", "repair"])
+def test_dataset_topologies_are_connected(mode):
+    ds = SignalGraphDataset(node_size=12, topology="radius", radius=4.0, ensure_connected=mode,
+                            sparse=True, seed=3)
+    for _ in range(20):
+        G = ds.getGraph()
+        rows = np.repeat(np.arange(G["num_nodes"]), np.diff(G["indptr"]))
+        roots = connected_components(G["num_nodes"], rows, G["indices"])
+        assert np.all(roots == roots[0])
+
+
+def test_min_algebraic_connectivity_is_enforced():
+    ds = SignalGraphDataset(node_size=8, min_algebraic_connectivity=0.5, seed=4)
+    for _ in range(10):
+        A = ds.getGraph()["A"]
+        lap = np.diag(A.sum(axis=1)) - A
+        assert np.linalg.eigvalsh(lap)[1] >= 0.5 - 1e-9
+
+
+def _random_adjacency(n, seed):
+    rng = np.random.default_rng(seed)
+    A = np.triu(rng.random((n, n)) < 0.4, k=1)
+    A[np.arange(n - 1), np.arange(1, n)] = True  # path keeps it connected
+    return (A | A.T).astype(np.float64)
+
+
+@pytest.mark.parametrize("scheme", ["metropolis", "best_constant"])
+def test_consensus_weights_are_symmetric_and_converge(scheme):
+    A = _random_adjacency(10, 5)
+    W = consensus_weights(A, scheme)
+    np.testing.assert_allclose(W, W.T)
+    assert np.all(W[A == 0] == 0)
+    assert 0.0 < consensus_rate(W) < 1.0
+
+    # x_i += sum_j W_ij (x_j - x_i) keeps the average and reaches it
+    x = np.random.default_rng(6).random(10)
+    avg = x.mean()
+    for _ in range(500):
+        x = x + W @ x - W.sum(axis=1) * x
+    assert x.mean() == pytest.approx(avg)
+    np.testing.assert_allclose(x, avg, atol=1e-6)
+
+
+def test_metropolis_weights():
+    A = _random_adjacency(8, 7)
+    W = consensus_weights(A)
+    deg = A.sum(axis=1)
+    i, j = np.nonzero(A)
+    np.testing.assert_allclose(W[i, j], 1.0 / (1.0 + np.maximum(deg[i], deg[j])))
+    assert np.all(W.sum(axis=1) < 1.0)
+
+
+def test_best_constant_is_not_slower_than_metropolis():
+    A = _random_adjacency(12, 8)
+    assert consensus_rate(consensus_weights(A, "best_constant")) <= consensus_rate(consensus_weights(A)) + 1e-12
+    with pytest.raises(ValueError):
+        consensus_weights(A, "uniform")
+
+
+def test_add_consensus_weights_follows_neighbour_order():
+    G = SignalGraphDataset(node_size=6, ensure_connected="repair", seed=9).getGraph()
+    W = add_consensus_weights(G["nodes_letters"], G["A"])
+    ids = list(G["nodes_letters"])
+    for nid, info in G["nodes_letters"].items():
+        i = ids.index(nid)
+        assert info["weights"] == pytest.approx([W[i, ids.index(n)] for n in info["neighbours"]])
+        assert info["rate"] == pytest.approx(consensus_rate(W))
+
+
+@pytest.mark.parametrize("node_size", [6, (3, 8)])
+@pytest.mark.parametrize("label_type", ["node", "graph"])
+def test_get_graphs_matches_get_graph(node_size, label_type):
+    batch = SignalGraphDataset(node_size=node_size, label_type=label_type, seed=11).getGraphs(8)
+    ds = SignalGraphDataset(node_size=node_size, label_type=label_type, seed=11)
+    for b in range(8):
+        G = ds.getGraph()
+        n = G["num_nodes"]
+        assert batch["num_nodes"][b] == n and batch["mask"][b].sum() == n
+        for name in ("x", "positions"):
+            np.testing.assert_array_equal(batch[name][b, :n], G[name])
+        for name in ("A", "adj"):
+            np.testing.assert_array_equal(batch[name][b, :n, :n], G[name])
+        np.testing.assert_array_equal(batch["y"][b, :n] if label_type == "node" else batch["y"][b], G["y"])
+        np.testing.assert_array_equal(batch["source"][b], G["source"])
+
+
+def test_dataset_leaves_the_global_rng_alone():
+    state = np.random.get_state()[1].copy()
+    SignalGraphDataset(node_size=5, seed=1).getGraphs(4)
+    np.testing.assert_array_equal(np.random.get_state()[1], state)
+
+
+@pytest.mark.parametrize("label_type", ["node", "graph"])
+def test_shard_store_round_trip(tmp_path, label_type):
+    ds = SignalGraphDataset(node_size=(3, 7), label_type=label_type, sparse=True, seed=12)
+    graphs = [ds.getGraph() for _ in range(10)]
+    with ShardWriter(str(tmp_path), shard_size=4) as writer:
+        for G in graphs:
+            writer.add(G)
+
+    store = ShardedGraphDataset(str(tmp_path))
+    assert len(store) == 10 and len(store.info["shards"]) == 3
+    # random access across shard boundaries, then sequential
+    for i in [9, 3, 4, 0, 7, 8]:
+        _assert_same_graph(store[i], graphs[i])
+    for G, ref in zip(store, graphs):
+        _assert_same_graph(G, ref)
+    assert all(isinstance(a, np.memmap) for name, a in store._shard(0).items() if name != "rowptr")
+
+
+def _assert_same_graph(G, ref):
+    assert G["num_nodes"] == ref["num_nodes"]
+    for name in ("x", "positions", "indptr", "indices", "edge_dist", "y", "source"):
+        np.testing.assert_array_equal(G[name], ref[name])
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_generate_chunks_is_independent_of_workers(sparse):
+    kwargs = dict(seed=13, chunk_size=3, node_size=(3, 6), sparse=sparse)
+    one = list(generate_chunks(8, workers=1, **kwargs))
+    two = list(generate_chunks(8, workers=2, **kwargs))
+    assert len(one) == len(two) == 3
+    for a, b in zip(one, two):
+        for Ga, Gb in (zip(a, b) if sparse else [(a, b)]):
+            for name in ("x", "positions", "y", "source", "A", "adj", "indptr", "indices", "edge_dist"):
+                if name in Ga:
+                    np.testing.assert_array_equal(Ga[name], Gb[name])
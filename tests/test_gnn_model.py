@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from batching import collate
+from dataset import SignalGraphDataset
+from gnn_model import GNNModel
+
+
+def _node_forward(model, batch, wire=None):
+    """Per-node forward over the CSR batch, as run_gnn() runs it on the radio."""
+    indptr, indices = batch["indptr"], batch["indices"]
+    h = [model.node_features(float(x), p) for x, p in zip(batch["x"][:, 0], batch["positions"])]
+    for l in range(model.num_layers):
+        sent = h if wire is None else [v.astype(wire).astype(np.float32) for v in h]
+        h = [model.node_layer(l, h[i], [sent[j] for j in indices[indptr[i]:indptr[i + 1]]])
+             for i in range(len(h))]
+    return np.stack([model.node_readout(v) for v in h])
+
+
+@pytest.fixture
+def setup():
+    dataset = SignalGraphDataset(node_size=12, topology="knn", k=3, seed=0, sparse=True)
+    batch = collate([dataset.getGraph() for _ in range(3)])
+    model = GNNModel.create(hidden=16, layers=3, seed=1)
+    model.params["W_out"] = np.random.default_rng(2).normal(size=model.params["W_out"].shape).astype(np.float32)
+    return model, batch
+
+
+def test_node_forward_matches_batched_float32(setup):
+    model, batch = setup
+    np.testing.assert_allclose(_node_forward(model, batch), model.forward(batch), rtol=1e-5, atol=1e-5)
+
+
+def test_node_forward_float16_transport_is_approximate(setup):
+    # float16 hidden vectors (when float32 does not fit in one frame) only match approximately
+    model, batch = setup
+    ref = model.forward(batch)
+    got = _node_forward(model, batch, wire=np.float16)
+    np.testing.assert_allclose(got, ref, rtol=1e-2, atol=1e-2)
+    assert not np.allclose(got, ref, rtol=1e-6, atol=1e-7)
@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+from digi.xbee.exception import TransmitException
+from digi.xbee.models.status import TransmitStatus
+
+from sim_device import SimXBeeDevice, UdpMedium, sim_addr_for
+
+
+def _device(name, registry):
+    # one UdpMedium per device, like separate processes started with --sim
+    dev = SimXBeeDevice(name, 9600, medium=UdpMedium(registry_dir=str(registry), latency_s=0.0, ack_timeout_s=0.2),
+                        addr64=sim_addr_for(name))
+    dev.open()
+    return dev
+
+
+def test_udp_medium_connects_separate_media(tmp_path):
+    a, b, c = (_device(n, tmp_path) for n in ("a", "b", "c"))
+    got = {n: [] for n in "bc"}
+    done = threading.Semaphore(0)
+    for name, dev in (("b", b), ("c", c)):
+        dev.add_data_received_callback(lambda msg, name=name: (got[name].append(msg), done.release()))
+
+    a.send_data_64(b.get_64bit_addr(), b"unicast")
+    a.send_data_broadcast(b"broadcast")
+    for _ in range(3):
+        assert done.acquire(timeout=1.0)
+    assert [m.data for m in got["b"]] == [b"unicast", b"broadcast"]
+    assert [m.data for m in got["c"]] == [b"broadcast"]
+    assert got["b"][0].remote_device.get_64bit_addr() == a.get_64bit_addr()
+    assert got["c"][0].is_broadcast
+
+
+def test_udp_medium_transmit_errors(tmp_path):
+    a, b = _device("a", tmp_path), _device("b", tmp_path)
+    with pytest.raises(TransmitException) as e:
+        a.send_data_64(sim_addr_for("nobody"), b"x")
+    assert e.value.status == TransmitStatus.ADDRESS_NOT_FOUND
+    b.close()
+    with pytest.raises(TransmitException) as e:
+        a.send_data_64(b.get_64bit_addr(), b"x")
+    assert e.value.status == TransmitStatus.NO_ACK
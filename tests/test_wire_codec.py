@@ -0,0 +1,111 @@
+import json
+
+import numpy as np
+import pytest
+
+from wire_codec import WireCodec, get_varint, put_varint, HID_OVERHEAD, VALV_OVERHEAD
+
+NODES = ["A", "B", "C", "D", "E"]
+
+
+@pytest.fixture
+def codec():
+    return WireCodec(NODES)
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 32 - 1, 2 ** 40])
+def test_varint_round_trip(value):
+    out = bytearray()
+    put_varint(out, value)
+    assert get_varint(bytes(out), 0) == (value, len(out))
+
+
+def test_varint_rejects_negative_and_truncated():
+    with pytest.raises(ValueError):
+        put_varint(bytearray(), -1)
+    with pytest.raises(ValueError):
+        get_varint(b"\x80", 0)
+
+
+@pytest.mark.parametrize("session", [None, 7, 2 ** 32 - 1])
+def test_val_round_trip(codec, session):
+    msg = codec.decode(codec.encode_val(12, "C", 0.625, session=session))
+    assert msg["type"] == "VAL" and msg["k"] == 12 and msg["src"] == "C"
+    assert msg["value"] == pytest.approx(0.625)
+    assert msg.get("sid") == session
+
+
+def test_val_flows_and_conv(codec):
+    msg = codec.decode(codec.encode_val(3, "A", 0.5, flows={"B": 0.25, "E": -0.125}, conv=(4, True)))
+    assert msg["f"] == pytest.approx({"B": 0.25, "E": -0.125})
+    assert msg["c"] == 4 and msg["d"] == 1
+
+
+@pytest.mark.parametrize("bits", [8, 16])
+def test_quantized_val(codec, bits):
+    data = codec.encode_val(1, "B", 0.3, bits=bits)
+    assert len(data) == 4 + bits // 8
+    assert codec.decode(data)["value"] == pytest.approx(0.3, abs=1.0 / (1 << bits))
+
+
+@pytest.mark.parametrize("session", [3, 2 ** 32 - 1])
+def test_vector_val_parts_fit_payload(codec, session):
+    values = np.linspace(0.0, 1.0, 20)
+    frames = codec.encode_val_parts(5, "D", values, max_payload=VALV_OVERHEAD + 16, conv=(9, True), session=session)
+    assert len(frames) == 5
+    assert all(len(f) <= VALV_OVERHEAD + 16 for f in frames)
+    got = np.full(20, np.nan)
+    for f in frames:
+        msg = codec.decode(f)
+        assert msg["dim"] == 20 and msg["sid"] == session
+        got[msg["o"]:msg["o"] + len(msg["value"])] = msg["value"]
+    np.testing.assert_allclose(got, values, rtol=1e-6)
+
+
+def test_init_round_trip(codec):
+    data = codec.encode_init(["B", "E"], 0.75, position=(1.5, -2.0), weights=[0.25, 0.5], rate=0.9, session=11)
+    msg = codec.decode(data)
+    assert msg["t"] is True and msg["n"] == ["B", "E"] and msg["sid"] == 11
+    assert msg["v"] == pytest.approx(0.75)
+    assert msg["w"] == pytest.approx([0.25, 0.5])
+    assert msg["r"] == pytest.approx(0.9)
+    assert msg["p"] == pytest.approx([1.5, -2.0])
+
+
+def test_vector_init(codec):
+    msg = codec.decode(codec.encode_init(["A"], [0.1, 0.2, 0.3]))
+    assert msg["v"] == pytest.approx([0.1, 0.2, 0.3])
+    assert "w" not in msg and "p" not in msg
+
+
+def test_nack_and_push_sum(codec):
+    assert codec.decode(codec.encode_nack(9, "E")) == {"type": "NACK", "k": 9, "src": "E"}
+    msg = codec.decode(codec.encode_push_sum(4, "A", 1.0 / 3.0, 2.5, session=1))
+    assert msg["s"] == 1.0 / 3.0 and msg["w"] == 2.5 and msg["sid"] == 1
+    assert "d" not in msg
+    assert codec.decode(codec.encode_push_sum(5, "A", 1.0, 2.0, done=True))["d"] == 1
+
+
+@pytest.mark.parametrize("wide,dtype", [(False, ">f2"), (True, ">f4")])
+@pytest.mark.parametrize("session", [None, 2 ** 32 - 1])
+def test_hidden_round_trip(codec, wide, dtype, session):
+    payload = np.arange(6, dtype=dtype).tobytes()
+    data = codec.encode_hidden(2, 1, 3, payload, wide=wide, session=session)
+    assert len(data) <= HID_OVERHEAD + len(payload)
+    msg = codec.decode(data)
+    assert (msg["l"], msg["i"], msg["c"]) == (2, 1, 3)
+    assert msg["h"] == payload and msg["dt"] == dtype
+    assert msg.get("sid") == session
+
+
+def test_json_frames_still_decode(codec):
+    msg = {"type": "VAL", "k": 1, "src": "A", "value": 0.5}
+    assert codec.decode(json.dumps(msg).encode("utf-8")) == msg
+
+
+def test_rejects_unknown_frames(codec):
+    with pytest.raises(ValueError):
+        codec.decode(b"\x10\x01")
+    with pytest.raises(ValueError):
+        codec.decode(bytes((0xC0 | 9, 1)))
+    assert codec.decode(b"") is None
@@ -1,18 +1,24 @@
 import matplotlib.pyplot as plt
+from dataset import dense_to_csr
 
 def visualize_graph(sample):
     x = sample["x"].squeeze(-1)          # shape: (num_nodes,)
     positions = sample["positions"]      # shape: (num_nodes, 2)
     source = sample["source"]            # shape: (2,)
     num_nodes = sample["num_nodes"]
-    A = sample["A"]                      # shape: (num_nodes, num_nodes)
+
+    # CSR neighbours (sparse graphs) or dense A (num_nodes, num_nodes)
+    if "indptr" in sample:
+        indptr, indices = sample["indptr"], sample["indices"]
+    else:
+        indptr, indices = dense_to_csr(sample["A"])
 
     plt.figure()
 
     # bridovi
     for i in range(num_nodes):
-        for j in range(i + 1, num_nodes):
-            if A[i, j] > 0:
+        for j in indices[indptr[i]:indptr[i + 1]]:
+            if j > i:
                 plt.plot(
                     [positions[i, 0], positions[j, 0]],
                     [positions[i, 1], positions[j, 1]],
@@ -34,9 +40,9 @@ def visualize_graph(sample):
         s=300,
     )
 
-        # oznake čvorova (A–E) ako graf ima 5 čvorova
-    if num_nodes == 5:
-        labels = ["A", "B", "C", "D", "E"]
+    # oznake čvorova (ID-evi iz nodes_letters), samo za manje grafove
+    labels = list(sample.get("nodes_letters", {}))
+    if 0 < num_nodes <= 50 and len(labels) == num_nodes:
         for i, label in enumerate(labels):
             plt.text(
                 positions[i, 0],
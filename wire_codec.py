@@ -0,0 +1,400 @@
+import argparse
+import json
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# byte 0: 0xC0 | version. Never '{' (0x7B), so JSON frames from older nodes still decode.
+# Version 2 is version 1 with a varint session id right after the 2-byte header.
+WIRE_MAGIC = 0xC0
+WIRE_VERSION = 1
+WIRE_VERSION_SESSION = 2
+
+# byte 1: message type
+MSG_VAL = 1
+MSG_INIT = 2
+MSG_HID = 3
+MSG_NACK = 4
+MSG_PSUM = 5
+MSG_VALF = 6
+MSG_VALQ8 = 7
+MSG_VALQ16 = 8
+MSG_VALV = 9
+MSG_HID32 = 10
+
+INIT_HAS_POSITION = 0x01
+INIT_HAS_WEIGHTS = 0x02
+INIT_HAS_RATE = 0x04
+INIT_HAS_VECTOR = 0x08
+
+_F32 = struct.Struct(">f")
+_F32x2 = struct.Struct(">ff")
+_F64x2 = struct.Struct(">dd")
+_QUANT = {8: (MSG_VALQ8, struct.Struct(">B")), 16: (MSG_VALQ16, struct.Struct(">H"))}
+_HID = struct.Struct(">BBB")  # layer, part, part count
+
+HEADER_SIZE = 2
+# HID without its payload: header + session (32-bit, 5-byte varint) + layer, part, part count
+HID_OVERHEAD = HEADER_SIZE + 5 + _HID.size
+# VALV without its floats: header + session (32-bit, 5-byte varint), then k, src,
+# dim, offset, count and the conv tail (3-byte varints)
+VALV_OVERHEAD = HEADER_SIZE + 5 + 6 * 3
+
+
+def put_varint(out: bytearray, value: int):
+    """Unsigned LEB128."""
+    if value < 0:
+        raise ValueError("varint must be non-negative")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def get_varint(data: bytes, pos: int):
+    value, shift = 0, 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated varint")
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7F) << shift
+        if b < 0x80:
+            return value, pos
+        shift += 7
+
+
+class WireCodec:
+    """
+    Binary frames for the consensus protocol. Nodes are sent as their index in
+    `node_ids` (config.json id_to_addr order, the same on central and nodes).
+    - VAL:  header, varint k, varint src index, float32 value
+    - INIT: header, flags, float32 value0 (or varint dim + float32 * dim), varint
+            count, varint neighbour indices,
+            [float32 weight per neighbour], [float32 rate], [float32 x, float32 y]
+    - HID:  header, layer, part, part count, float16 payload (GNN hidden vectors)
+    - HID32: HID with a float32 payload (sent when the whole vector fits one frame)
+    - VALF: VAL + varint count + (varint neighbour index, float32 cumulative edge flow) pairs
+            VAL / VALF may end with varint (converged rounds << 1 | done) for early stopping
+    - VALQ8 / VALQ16: VAL with the value as uint8 / uint16 fixed point over `value_range`
+    - VALV: vector VAL part: header, varint k, varint src index, varint dim,
+            varint offset, varint count, float32 * count [, conv varint]
+    - NACK: header, varint k, varint src index (request to resend VAL k)
+    - PSUM: header, varint seq, varint src index, float64 sent s, float64 sent w
+            (push-sum running sums; float64 since they only grow) [, varint 1 = sender finished]
+    Every encoder takes `session`: the frame then goes out as
+    version 2 with the session id after the header, decoded as "sid".
+    decode() returns the same dicts as the JSON messages ({"type": "VAL", ...},
+    {"t": True, "n": ..., "v": ...}), JSON frames are decoded as JSON.
+    """
+
+    def __init__(self, node_ids, value_range=(0.0, 1.0)):
+        self.node_ids = [str(n) for n in node_ids]
+        self.index = {nid: i for i, nid in enumerate(self.node_ids)}
+        self.value_range = (float(value_range[0]), float(value_range[1]))
+
+    def _level(self, value: float, bits: int) -> int:
+        lo, hi = self.value_range
+        return round((min(max(value, lo), hi) - lo) / (hi - lo) * ((1 << bits) - 1))
+
+    def _from_level(self, level: int, bits: int) -> float:
+        lo, hi = self.value_range
+        return lo + level * (hi - lo) / ((1 << bits) - 1)
+
+    def quantize(self, value: float, bits: int) -> float:
+        """Nearest `bits`-bit fixed-point level in value_range (what a VALQ frame carries)."""
+        return self._from_level(self._level(value, bits), bits)
+
+    def _header(self, msg_type: int, session: Optional[int] = None) -> bytearray:
+        if session is None:
+            return bytearray((WIRE_MAGIC | WIRE_VERSION, msg_type))
+        out = bytearray((WIRE_MAGIC | WIRE_VERSION_SESSION, msg_type))
+        put_varint(out, int(session))
+        return out
+
+    # ---------------- encode ----------------
+    def encode_val(self, k: int, src: str, value: float, flows: Optional[Dict[str, float]] = None,
+                   conv: Optional[Tuple[int, bool]] = None, bits: Optional[int] = None,
+                   session: Optional[int] = None) -> bytes:
+        # flows need the float32 value (VALF), quantization only applies to plain VAL
+        quant = _QUANT[bits] if bits is not None and flows is None else None
+        out = self._header(quant[0] if quant else MSG_VAL if flows is None else MSG_VALF, session)
+        put_varint(out, int(k))
+        put_varint(out, self.index[src])
+        if quant:
+            out += quant[1].pack(self._level(value, bits))
+        else:
+            out += _F32.pack(value)
+        if flows is not None:
+            put_varint(out, len(flows))
+            for n, flow in flows.items():
+                put_varint(out, self.index[n])
+                out += _F32.pack(flow)
+        if conv is not None:
+            put_varint(out, (int(conv[0]) << 1) | int(bool(conv[1])))
+        return bytes(out)
+
+    def encode_init(self, neighbors: List[str], value0: float, position=None,
+                    weights: Optional[List[float]] = None, rate: Optional[float] = None,
+                    session: Optional[int] = None) -> bytes:
+        out = self._header(MSG_INIT, session)
+        vector = np.ndim(value0) > 0
+        out.append((INIT_HAS_POSITION if position is not None else 0)
+                   | (INIT_HAS_WEIGHTS if weights is not None else 0)
+                   | (INIT_HAS_RATE if rate is not None else 0)
+                   | (INIT_HAS_VECTOR if vector else 0))
+        if vector:
+            put_varint(out, len(value0))
+            out += np.asarray(value0, dtype=">f4").tobytes()
+        else:
+            out += _F32.pack(value0)
+        put_varint(out, len(neighbors))
+        for n in neighbors:
+            put_varint(out, self.index[str(n)])
+        if weights is not None:
+            for w in weights:
+                out += _F32.pack(w)
+        if rate is not None:
+            out += _F32.pack(rate)
+        if position is not None:
+            out += _F32x2.pack(*position)
+        return bytes(out)
+
+    def encode_val_parts(self, k: int, src: str, values, max_payload: int,
+                         conv: Optional[Tuple[int, bool]] = None, session: Optional[int] = None) -> List[bytes]:
+        """Vector value as VALV frames of at most `max_payload` bytes each."""
+        values = np.asarray(values, dtype=">f4").ravel()
+        per_part = max(1, (max_payload - VALV_OVERHEAD) // 4)
+        frames = []
+        for offset in range(0, len(values), per_part):
+            part = values[offset:offset + per_part]
+            out = self._header(MSG_VALV, session)
+            for field in (int(k), self.index[src], len(values), offset, len(part)):
+                put_varint(out, field)
+            out += part.tobytes()
+            if conv is not None:
+                put_varint(out, (int(conv[0]) << 1) | int(bool(conv[1])))
+            frames.append(bytes(out))
+        return frames
+
+    def encode_nack(self, k: int, src: str, session: Optional[int] = None) -> bytes:
+        out = self._header(MSG_NACK, session)
+        put_varint(out, int(k))
+        put_varint(out, self.index[src])
+        return bytes(out)
+
+    def encode_push_sum(self, seq: int, src: str, sent_s: float, sent_w: float, done: bool = False,
+                        session: Optional[int] = None) -> bytes:
+        out = self._header(MSG_PSUM, session)
+        put_varint(out, int(seq))
+        put_varint(out, self.index[src])
+        out += _F64x2.pack(sent_s, sent_w)
+        if done:
+            put_varint(out, 1)
+        return bytes(out)
+
+    def encode_hidden(self, layer: int, part: int, count: int, payload: bytes, wide: bool = False,
+                      session: Optional[int] = None) -> bytes:
+        """HID part; `wide` marks a float32 payload (HID32) instead of float16."""
+        return bytes(self._header(MSG_HID32 if wide else MSG_HID, session)) + _HID.pack(layer, part, count) + payload
+
+    # ---------------- decode ----------------
+    def decode(self, data: bytes) -> Optional[Dict[str, Any]]:
+        if not data:
+            return None
+        if data[:1] == b"{":
+            return json.loads(data.decode("utf-8"))
+        if data[0] & 0xF0 != WIRE_MAGIC or len(data) < HEADER_SIZE:
+            raise ValueError(f"not a wire frame (byte0=0x{data[0]:02X})")
+        version = data[0] & 0x0F
+        if version not in (WIRE_VERSION, WIRE_VERSION_SESSION):
+            raise ValueError(f"unsupported wire version {version}")
+
+        msg_type, pos = data[1], HEADER_SIZE
+        session = None
+        if version == WIRE_VERSION_SESSION:
+            session, pos = get_varint(data, pos)
+        msg = self._decode_body(data, msg_type, pos)
+        if session is not None:
+            msg["sid"] = session
+        return msg
+
+    def _decode_body(self, data: bytes, msg_type: int, pos: int) -> Dict[str, Any]:
+        if msg_type in (MSG_VAL, MSG_VALF, MSG_VALQ8, MSG_VALQ16, MSG_VALV, MSG_NACK, MSG_PSUM):
+            k, pos = get_varint(data, pos)
+            src, pos = get_varint(data, pos)
+            if msg_type == MSG_NACK:
+                return {"type": "NACK", "k": k, "src": self.node_ids[src]}
+            if msg_type == MSG_PSUM:
+                sent_s, sent_w = _F64x2.unpack_from(data, pos)
+                msg = {"type": "PSUM", "k": k, "src": self.node_ids[src], "s": sent_s, "w": sent_w}
+                pos += _F64x2.size
+                if pos < len(data) and get_varint(data, pos)[0] & 1:
+                    msg["d"] = 1
+                return msg
+            if msg_type == MSG_VALV:
+                dim, pos = get_varint(data, pos)
+                offset, pos = get_varint(data, pos)
+                count, pos = get_varint(data, pos)
+                value = np.frombuffer(data, dtype=">f4", count=count, offset=pos).astype(np.float64).tolist()
+                pos += 4 * count
+            elif msg_type in (MSG_VALQ8, MSG_VALQ16):
+                bits = 8 if msg_type == MSG_VALQ8 else 16
+                fmt = _QUANT[bits][1]
+                value = self._from_level(fmt.unpack_from(data, pos)[0], bits)
+                pos += fmt.size
+            else:
+                (value,) = _F32.unpack_from(data, pos)
+                pos += _F32.size
+            msg = {"type": "VAL", "k": k, "src": self.node_ids[src], "value": value}
+            if msg_type == MSG_VALV:
+                msg["dim"], msg["o"] = dim, offset
+            if msg_type == MSG_VALF:
+                count, pos = get_varint(data, pos)
+                flows = {}
+                for _ in range(count):
+                    idx, pos = get_varint(data, pos)
+                    (flows[self.node_ids[idx]],) = _F32.unpack_from(data, pos)
+                    pos += _F32.size
+                msg["f"] = flows
+            if pos < len(data):
+                conv, pos = get_varint(data, pos)
+                msg["c"] = conv >> 1
+                if conv & 1:
+                    msg["d"] = 1
+            return msg
+
+        if msg_type == MSG_INIT:
+            flags = data[pos]
+            if flags & INIT_HAS_VECTOR:
+                dim, pos = get_varint(data, pos + 1)
+                value0 = np.frombuffer(data, dtype=">f4", count=dim, offset=pos).astype(np.float64).tolist()
+                pos += 4 * dim
+            else:
+                (value0,) = _F32.unpack_from(data, pos + 1)
+                pos += 1 + _F32.size
+            count, pos = get_varint(data, pos)
+            neighbors = []
+            for _ in range(count):
+                idx, pos = get_varint(data, pos)
+                neighbors.append(self.node_ids[idx])
+            msg = {"t": True, "n": neighbors, "v": value0}
+            if flags & INIT_HAS_WEIGHTS:
+                msg["w"] = [_F32.unpack_from(data, pos + i * _F32.size)[0] for i in range(count)]
+                pos += count * _F32.size
+            if flags & INIT_HAS_RATE:
+                (msg["r"],) = _F32.unpack_from(data, pos)
+                pos += _F32.size
+            if flags & INIT_HAS_POSITION:
+                msg["p"] = list(_F32x2.unpack_from(data, pos))
+            return msg
+
+        if msg_type in (MSG_HID, MSG_HID32):
+            layer, part, count = _HID.unpack_from(data, pos)
+            return {"type": "HID", "l": layer, "i": part, "c": count, "h": data[pos + _HID.size:],
+                    "dt": ">f4" if msg_type == MSG_HID32 else ">f2"}
+
+        raise ValueError(f"unknown message type {msg_type}")
+
+
+def quantized_consensus(W, x0, bits: Optional[int], iters: int, error_feedback: bool = True, codec=None):
+    """
+    Offline (no radio) synchronous consensus x_i += sum_j W_ij (q_j - x_i)
+    like ConsensusNode._update, where q are the neighbour values as they go
+    on air: `bits`-bit fixed point (None = exact), with error feedback
+    q = Q(x + e), e = x + e - q so the rounding does not pile up as a bias
+    in the average. Returns the final x.
+    """
+    codec = codec or WireCodec([])
+    x = np.asarray(x0, dtype=np.float64).copy()
+    e = np.zeros_like(x)
+    deg = W.sum(axis=1)
+    for _ in range(iters):
+        if bits is None:
+            q = x
+        else:
+            target = x + e if error_feedback else x
+            q = np.array([codec.quantize(v, bits) for v in target])
+            if error_feedback:
+                e = target - q
+        x = x + W @ q - deg * x
+    return x
+
+
+def main():
+    """Bytes per frame and encode/decode cost, binary codec vs the JSON messages."""
+    from sim_device import FRAME_OVERHEAD_BYTES
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--nodes", type=int, default=50)
+    ap.add_argument("--degree", type=int, default=3)
+    ap.add_argument("--iters", type=int, default=60)
+    ap.add_argument("--baud", type=int, default=9600)
+    ap.add_argument("--repeat", type=int, default=20000)
+    ap.add_argument("--bits", type=int, nargs="+", default=[4, 6, 8, 12, 16],
+                    help="offline accuracy check of quantized VALs (consensus on dataset graphs)")
+    ap.add_argument("--graphs", type=int, default=20)
+    ap.add_argument("--check_nodes", type=int, default=10)
+    ap.add_argument("--check_iters", type=int, default=200)
+    args = ap.parse_args()
+
+    from dataset import node_labels
+    ids = node_labels(args.nodes)
+    codec = WireCodec(ids)
+    rng = np.random.default_rng(0)
+    values = rng.random(args.repeat).tolist()
+    ks = rng.integers(0, args.iters, args.repeat).tolist()
+    srcs = [ids[i] for i in rng.integers(0, args.nodes, args.repeat)]
+    neighbors = [ids[i] for i in rng.choice(args.nodes, args.degree, replace=False)]
+
+    def bench(encode, decode):
+        t0 = time.perf_counter()
+        frames = [encode(k, s, v) for k, s, v in zip(ks, srcs, values)]
+        t1 = time.perf_counter()
+        for f in frames:
+            decode(f)
+        t2 = time.perf_counter()
+        size = float(np.mean([len(f) for f in frames]))
+        return size, (t1 - t0) / len(frames) * 1e6, (t2 - t1) / len(frames) * 1e6
+
+    def json_val(k, src, value):
+        return json.dumps({"type": "VAL", "k": k, "src": src, "value": value}).encode("utf-8")
+
+    rows = {
+        "json": bench(json_val, lambda f: json.loads(f.decode("utf-8"))),
+        "binary": bench(codec.encode_val, codec.decode),
+        "q16": bench(lambda k, s, v: codec.encode_val(k, s, v, bits=16), codec.decode),
+        "q8": bench(lambda k, s, v: codec.encode_val(k, s, v, bits=8), codec.decode),
+    }
+    init_json = len(json.dumps({"t": True, "n": neighbors, "v": values[0]}).encode("utf-8"))
+    init_bin = len(codec.encode_init(neighbors, values[0]))
+
+    for name, (size, enc_us, dec_us) in rows.items():
+        # one VAL per neighbour per iteration, each with the radio frame overhead
+        airtime_ms = args.degree * (size + FRAME_OVERHEAD_BYTES) * 10 / args.baud * 1e3
+        print(f"[CODEC] {name:6s} VAL {size:5.1f} B  encode {enc_us:5.2f} us  decode {dec_us:5.2f} us  "
+              f"airtime/iteration (degree {args.degree}) {airtime_ms:6.1f} ms")
+    print(f"[CODEC] INIT (degree {args.degree}) json {init_json} B  binary {init_bin} B")
+    print(f"[CODEC] VAL payload {rows['json'][0] / rows['binary'][0]:.1f}x smaller")
+
+    # final accuracy vs bits, with and without error feedback (metropolis weights)
+    from dataset import SignalGraphDataset, consensus_weights
+    dataset = SignalGraphDataset(node_size=args.check_nodes, topology="knn", k=args.degree,
+                                 ensure_connected="repair", seed=0)
+    graphs = [dataset.getGraph() for _ in range(args.graphs)]
+    for bits in [None] + args.bits:
+        for ef in ([True] if bits is None else [True, False]):
+            err, drift = [], []
+            for G in graphs:
+                x0 = G["x"][:, 0].astype(np.float64)
+                x = quantized_consensus(consensus_weights(G["A"]), x0, bits, args.check_iters, ef, codec)
+                err.append(np.max(np.abs(x - x0.mean())))
+                drift.append(abs(x.mean() - x0.mean()))
+            name = "float32" if bits is None else f"{bits:2d} bit" + (" +EF" if ef else "    ")
+            print(f"[CODEC] {name:11s} {args.check_iters} iters: max_error={np.mean(err):.2e} drift={np.mean(drift):.1e}")
+
+
+if __name__ == "__main__":
+    main()
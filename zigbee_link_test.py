@@ -25,6 +25,8 @@ from digi.xbee.devices import ZigBeeDevice
 from digi.xbee.models.address import XBee64BitAddress, XBee16BitAddress
 from digi.xbee.exception import TransmitException
 
+from sim_device import SimXBeeDevice
+
 
 PING_MAGIC = b"PING"
 PONG_MAGIC = b"PONG"
@@ -56,7 +58,7 @@ def parse(msg: bytes):
     seq = struct.unpack(">H", msg[4:6])[0]
     return magic, seq
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--mode", choices=["sender", "responder"], required=True)
     ap.add_argument("--port", default="/dev/ttyUSB0")
@@ -65,9 +67,10 @@ def main():
     ap.add_argument("--payload", type=int, default=50, help="RF payload bytes to send (<= NP)")
     ap.add_argument("--count", type=int, default=10)
     ap.add_argument("--timeout", type=float, default=2.0)
-    args = ap.parse_args()
+    ap.add_argument("--sim", action="store_true", help="simulated radio (sim_device.py, UDP on localhost) instead of a serial XBee")
+    args = ap.parse_args(argv)
 
-    dev = ZigBeeDevice(args.port, args.baud)
+    dev = SimXBeeDevice(args.port, args.baud) if args.sim else ZigBeeDevice(args.port, args.baud)
     dev.open()
     dev.set_sync_ops_timeout(int(max(1, args.timeout)))
 